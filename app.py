@@ -1,11 +1,8 @@
-from app import create_app, db
+from app import create_app
 
+# The schema is managed by Alembic (`flask db upgrade`) or `flask init-db`;
+# starting the app never creates or alters tables.
 app = create_app()
 
-# Create database tables before the first request
-@app.before_first_request
-def initialize_database():
-    db.create_all()
-
 if __name__ == '__main__':
     app.run(debug=True)
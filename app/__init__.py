@@ -1,4 +1,5 @@
 #__init__.py
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -21,8 +22,28 @@ def create_app(config_class=Config):
 
     jwt = JWTManager(app)
 
+    from . import revocation
+    revocation.init_app(jwt)
+
+    from .cache import catalog_cache, role_cache
+    catalog_cache.configure(ttl=app.config['CATALOG_CACHE_TTL'], maxsize=app.config['CATALOG_CACHE_MAXSIZE'])
+    role_cache.configure(ttl=app.config['ROLE_CACHE_TTL'])
+
+    from . import notify
+    notify.init_app(app)
+
+    # Concurrency limits and rate limits per route group
+    from . import admission
+    admission.init_app(app)
+
     from .routes import main_bp
     app.register_blueprint(main_bp)
+
+    from . import events
+    events.init_app(app)
+
+    from . import batch
+    batch.init_app(app)
     
     CORS(app) 
 
@@ -33,4 +54,24 @@ def create_app(config_class=Config):
         db.create_all()
         print("Database initialized.")
 
+    # Background job worker
+    @app.cli.command("worker")
+    @click.option("--concurrency", type=int, default=None, help="Number of worker threads.")
+    @click.option("--poll-interval", type=float, default=None, help="Seconds to wait when the queue is empty.")
+    @click.option("--burst", is_flag=True, help="Exit once the queue is empty.")
+    def worker(concurrency, poll_interval, burst):
+        """Run background jobs from the jobs table."""
+        from .jobs import run_worker
+        run_worker(app, concurrency=concurrency, poll_interval=poll_interval, burst=burst)
+
+    # Partition maintenance commands (flask partitions ...)
+    from .partitions import partitions_cli
+    app.cli.add_command(partitions_cli)
+
+    # Reporting jobs (flask forecast ...)
+    from .forecasting import forecast_cli
+    app.cli.add_command(forecast_cli)
+    from .recommendations import recommendations_cli
+    app.cli.add_command(recommendations_cli)
+
     return app
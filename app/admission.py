@@ -0,0 +1,174 @@
+"""Admission control: per-route-group concurrency limits and rate limits.
+
+Requests are sorted into groups by path prefix (``ADMISSION_ROUTE_GROUPS``:
+auth, catalog, checkout, admin). Each group can have:
+
+* a concurrency limit per worker process (``ADMISSION_CONCURRENCY``). A
+  request that can't get a slot within ``ADMISSION_MAX_WAIT`` seconds gets
+  503, so slow logins or admin reports can't take every thread and starve
+  the catalog. This matters with threaded or gevent workers; a sync worker
+  only ever runs one request anyway. ``/batch`` sub-requests run under the
+  batch's own slot and are only rate limited.
+* a token bucket per client (``ADMISSION_RATE_LIMITS``, as
+  ``(requests per second, burst)``), keyed by JWT identity or, for
+  anonymous requests, by IP address. Requests over the rate get 429.
+  Behind a reverse proxy, set ``TRUSTED_PROXIES`` so the address is the
+  client's rather than the proxy's.
+
+Both rejections carry ``Retry-After``. Buckets live in process memory by
+default. With ``ADMISSION_RATE_LIMIT_BACKEND = 'postgres'`` they live in
+the ``rate_limit_buckets`` table instead and are shared by every worker,
+at the cost of one small upsert per rate-limited request.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import text
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from . import db
+
+ENVIRON_SLOT = 'glam.admission_slot'
+
+
+class MemoryBuckets:
+    """Token buckets in process memory, oldest keys dropped past ``maxsize``."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token; returns 0 when admitted, else the seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class PostgresBuckets:
+    """Token buckets shared by all workers, refilled and taken in one upsert."""
+
+    _REFILL = "LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate)"
+    _TAKE = text(f"""
+    INSERT INTO rate_limit_buckets AS b (key, tokens, admitted, updated_at)
+    VALUES (:key, :burst - 1, true, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = CASE WHEN {_REFILL} >= 1 THEN {_REFILL} - 1 ELSE {_REFILL} END,
+        admitted = {_REFILL} >= 1,
+        updated_at = clock_timestamp()
+    RETURNING b.tokens, b.admitted
+    """)
+
+    def take(self, key, rate, burst):
+        with db.engine.begin() as connection:
+            row = connection.execute(self._TAKE, {"key": key, "rate": rate, "burst": burst}).one()
+        return 0 if row.admitted else (1 - row.tokens) / rate
+
+
+class Admission:
+    def __init__(self):
+        self.groups = []
+        self.semaphores = {}
+        self.buckets = MemoryBuckets()
+
+    def configure(self, config):
+        groups = []
+        for group, routes in config['ADMISSION_ROUTE_GROUPS'].items():
+            for route in routes:
+                method, _, prefix = route.rpartition(' ')
+                groups.append((method.upper() or None, prefix.rstrip('/'), group))
+        # Longest prefixes first (so /users/reset_password wins over /users), method-specific before any-method
+        self.groups = sorted(groups, key=lambda item: (len(item[1]), item[0] is not None), reverse=True)
+        self.semaphores = {
+            group: threading.BoundedSemaphore(limit) for group, limit in config['ADMISSION_CONCURRENCY'].items()
+        }
+        self.buckets = PostgresBuckets() if config['ADMISSION_RATE_LIMIT_BACKEND'] == 'postgres' else MemoryBuckets()
+
+    def group_for(self, path, method=None):
+        for route_method, prefix, group in self.groups:
+            if route_method is not None and route_method != method:
+                continue
+            if path == prefix or path.startswith(prefix + '/'):
+                return group
+        return None
+
+
+admission = Admission()
+
+
+def client_key():
+    """The JWT identity when a valid token is sent, otherwise the client address."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if identity is not None:
+        return f"user:{identity}"
+    return f"ip:{request.remote_addr}"
+
+
+def reject(status, message, retry_after):
+    response = make_response(jsonify({"error": message}), status)
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admit():
+    """``before_request`` hook: rate limit, then take a concurrency slot for the request's group."""
+    group = admission.group_for(request.path, request.method)
+    if group is None or request.method == 'OPTIONS':
+        return None
+    config = current_app.config
+
+    limit = config['ADMISSION_RATE_LIMITS'].get(group)
+    if limit:
+        rate, burst = limit
+        wait = admission.buckets.take(f"{group}:{client_key()}", rate, burst)
+        if wait:
+            return reject(429, "Too many requests", wait)
+
+    # A batch holds one 'batch' slot for all its sub-requests; making each of them
+    # compete for their group's slots as well would let a batch 503 itself
+    if request.environ.get('glam.batch'):
+        return None
+
+    semaphore = admission.semaphores.get(group)
+    if semaphore is not None:
+        if not semaphore.acquire(timeout=config['ADMISSION_MAX_WAIT']):
+            return reject(503, "Server busy, please retry shortly", config['ADMISSION_RETRY_AFTER'])
+        request.environ[ENVIRON_SLOT] = semaphore
+    return None
+
+
+def release(exc=None):
+    """``teardown_request`` hook: give back the slot taken by ``admit``."""
+    semaphore = request.environ.pop(ENVIRON_SLOT, None)
+    if semaphore is not None:
+        semaphore.release()
+
+
+def init_app(app):
+    if app.config['TRUSTED_PROXIES']:
+        hops = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    if not app.config['ADMISSION_ENABLED']:
+        return
+    admission.configure(app.config)
+    app.before_request(admit)
+    app.teardown_request(release)
@@ -0,0 +1,158 @@
+"""``POST /batch``: many API calls in one HTTP round trip.
+
+The body is a list of sub-requests::
+
+    [{"method": "GET", "path": "/suppliers/3"},
+     {"method": "PUT", "path": "/products/7", "body": {"price": 12.5}}]
+
+and the response is a list of ``{"status": ..., "body": ...}`` in the same
+order. Each sub-request is dispatched through the normal URL map and view
+functions, with the caller's ``Authorization`` header, so it is
+authenticated like a standalone call: its ``@jwt_required`` decodes the
+token and runs the revocation check again. Both are in memory in the common
+case, and re-checking means a sub-request that revokes the token (a logout
+or a role change) applies to the rest of the batch. What a batch saves is
+the HTTP round trips, not the token checks.
+
+Sub-requests run in order and share the batch's app context, so they use
+the same database session. A run of consecutive GETs is independent, so
+those GETs run concurrently on up to ``BATCH_MAX_WORKERS`` threads, each
+with its own app context and session. Writes always act as a barrier.
+Sub-requests are marked with ``glam.batch`` in the WSGI environ.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from werkzeug.exceptions import HTTPException
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Forwarded from the batch request to every sub-request
+FORWARDED_HEADERS = ('Authorization',)
+
+# Views that stream until the client disconnects; running one inside a batch would never finish
+STREAMING_ENDPOINTS = {'events.order_events_stream'}
+
+
+def endpoint_for(path, method):
+    """The endpoint a sub-request would be routed to, or None when nothing matches."""
+    adapter = current_app.url_map.bind('localhost')
+    try:
+        endpoint, _ = adapter.match(path.split('?', 1)[0], method=method)
+    except HTTPException:
+        return None
+    return endpoint
+
+
+def parse_sub_requests(data):
+    """Validate the posted list; returns ``(sub-requests, error message)``."""
+    if not isinstance(data, list) or not data:
+        return None, "Expected a non-empty list of requests"
+    limit = current_app.config['BATCH_MAX_REQUESTS']
+    if len(data) > limit:
+        return None, f"A batch can have at most {limit} requests"
+
+    sub_requests = []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            return None, f"Request {index} must be an object"
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in METHODS:
+            return None, f"Request {index} has an unsupported method"
+        if not isinstance(path, str) or not path.startswith('/'):
+            return None, f"Request {index} needs a path starting with '/'"
+        endpoint = endpoint_for(path, method)
+        if endpoint == 'batch.batch':
+            return None, "Batches can't be nested"
+        if endpoint in STREAMING_ENDPOINTS:
+            return None, f"Request {index} is a streaming endpoint, which can't be batched"
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict):
+            return None, f"Request {index} has invalid headers"
+        sub_requests.append({"method": method, "path": path, "body": item.get('body'), "headers": headers})
+    return sub_requests, None
+
+
+def dispatch(app, sub_request, forwarded):
+    """Run one sub-request through the app's URL map and return its result entry."""
+    headers = {**sub_request['headers'], **forwarded}
+    options = {"method": sub_request['method'], "headers": headers,
+               "environ_overrides": {"glam.batch": True}}
+    if sub_request['body'] is not None:
+        options["json"] = sub_request['body']
+
+    with app.test_request_context(sub_request['path'], **options):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            logger.exception("Batched %s %s failed", sub_request['method'], sub_request['path'])
+            db.session.rollback()
+            return {"status": 500, "body": {"error": "An internal server error occurred"}}
+
+        if response.mimetype == 'text/event-stream':
+            response.close()
+            return {"status": 400, "body": {"error": "Streaming endpoints can't be batched"}}
+        # Error pages (404, 405, ...) are iterable responses too; get_data() buffers any of them
+        body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+        return {"status": response.status_code, "body": body}
+
+
+def dispatch_isolated(app, sub_request, forwarded):
+    """``dispatch`` on a worker thread, with its own app context and session."""
+    with app.app_context():
+        return dispatch(app, sub_request, forwarded)
+
+
+def runs(sub_requests):
+    """Split into runs: consecutive GETs together, everything else on its own."""
+    current = []
+    for sub_request in sub_requests:
+        if sub_request['method'] == 'GET':
+            current.append(sub_request)
+            continue
+        if current:
+            yield current
+            current = []
+        yield [sub_request]
+    if current:
+        yield current
+
+
+@batch_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    sub_requests, error = parse_sub_requests(request.get_json(silent=True))
+    if error:
+        return jsonify({"error": error}), 400
+
+    app = current_app._get_current_object()
+    forwarded = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    max_workers = current_app.config['BATCH_MAX_WORKERS']
+
+    results = []
+    executor = None
+    try:
+        for run in runs(sub_requests):
+            if len(run) > 1 and max_workers > 1:
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=max_workers)
+                results.extend(executor.map(lambda sub_request: dispatch_isolated(app, sub_request, forwarded), run))
+            else:
+                results.extend(dispatch(app, sub_request, forwarded) for sub_request in run)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return jsonify(results), 200
+
+
+def init_app(app):
+    app.register_blueprint(batch_bp)
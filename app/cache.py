@@ -0,0 +1,78 @@
+"""In-process caches.
+
+``catalog_cache`` holds serialized catalog entities (products, suppliers)
+keyed by ``(namespace, id)``; ``role_cache`` maps a user id to its
+``is_admin`` flag. Entries expire after their TTL and are evicted on every
+worker when the row changes (see app/notify.py).
+"""
+import threading
+import time
+
+
+class TTLCache:
+    """A small thread-safe dict with per-entry expiry and a size bound (oldest entries evicted first)."""
+
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl=None, maxsize=None):
+        if ttl is not None:
+            self.ttl = ttl
+        if maxsize is not None:
+            self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Return a dict of the keys that are cached and still fresh."""
+        now = time.monotonic()
+        hits = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at > now:
+                    hits[key] = value
+                else:
+                    del self._data[key]
+        return hits
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        if self.ttl <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            for key, value in mapping.items():
+                self._data.pop(key, None)
+                self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                # dicts keep insertion order, so the first key is the oldest
+                del self._data[next(iter(self._data))]
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_namespace(self, namespace):
+        """Drop every ``(namespace, ...)`` key."""
+        with self._lock:
+            for key in [key for key in self._data if key[0] == namespace]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+catalog_cache = TTLCache()
+role_cache = TTLCache()
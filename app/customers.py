@@ -0,0 +1,117 @@
+"""Admin customer list: users with their order and payment aggregates.
+
+``customers_page`` reads one page with a single statement. Orders and
+transactions are each grouped by user in a subquery and left-joined to
+``users``. Pages are keyset-paginated on ``(sort value, uid)``, so a deep
+page costs the same as the first, and rows don't shift when customers
+order in between. The cursor is the last row's sort value and uid,
+encoded as URL-safe base64 JSON.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, literal, select, tuple_
+
+from . import db
+from .model import Order, Transaction, User
+
+# Oldest possible "last order" date, so customers without orders sort consistently
+NEVER = datetime(1970, 1, 1)
+
+
+class CursorError(ValueError):
+    pass
+
+
+def aggregates():
+    """``(order_stats, transaction_stats)`` subqueries, one row per user."""
+    order_stats = (
+        select(
+            Order.user_id,
+            func.count(Order.id).label('order_count'),
+            func.max(Order.created_at).label('last_order_at')
+        )
+        .group_by(Order.user_id)
+        .subquery('order_stats')
+    )
+    transaction_stats = (
+        select(
+            Transaction.user_id,
+            func.sum(Transaction.amount).filter(Transaction.payment_status == 'Paid').label('total_spent'),
+            func.count().filter(Transaction.payment_status == 'Paid').label('paid'),
+            func.count().filter(Transaction.payment_status == 'Pending').label('pending')
+        )
+        .group_by(Transaction.user_id)
+        .subquery('transaction_stats')
+    )
+    return order_stats, transaction_stats
+
+
+def sort_columns(order_stats, transaction_stats):
+    """Sortable name -> ``(expression, cursor value parser)``."""
+    return {
+        "uid": (User.uid, int),
+        "name": (User.name, str),
+        "order_count": (func.coalesce(order_stats.c.order_count, 0), int),
+        "total_spent": (func.coalesce(transaction_stats.c.total_spent, 0), Decimal),
+        "last_order_at": (func.coalesce(order_stats.c.last_order_at, NEVER), datetime.fromisoformat),
+    }
+
+
+def encode_cursor(value, uid):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else str(value), uid])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, parse):
+    try:
+        value, uid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return parse(value), int(uid)
+    except (binascii.Error, ValueError, TypeError, InvalidOperation, UnicodeDecodeError):
+        raise CursorError("Invalid cursor")
+
+
+def customers_page(sort, descending, limit, cursor=None, options=()):
+    """One page of ``(user, stats dict)`` and the cursor of the next page (None on the last)."""
+    order_stats, transaction_stats = aggregates()
+    sort_expression, parse = sort_columns(order_stats, transaction_stats)[sort]
+    key = tuple_(sort_expression, User.uid)
+
+    stmt = (
+        select(
+            User,
+            sort_expression.label('sort_value'),
+            func.coalesce(order_stats.c.order_count, 0).label('order_count'),
+            func.coalesce(transaction_stats.c.total_spent, 0).label('total_spent'),
+            order_stats.c.last_order_at,
+            func.coalesce(transaction_stats.c.paid, 0).label('paid'),
+            func.coalesce(transaction_stats.c.pending, 0).label('pending')
+        )
+        .outerjoin(order_stats, order_stats.c.user_id == User.uid)
+        .outerjoin(transaction_stats, transaction_stats.c.user_id == User.uid)
+        .options(*options)
+        .order_by(*((sort_expression.desc(), User.uid.desc()) if descending else (sort_expression, User.uid)))
+        .limit(limit + 1)
+    )
+    if cursor:
+        after = tuple_(*(literal(part) for part in decode_cursor(cursor, parse)))
+        stmt = stmt.where(key < after if descending else key > after)
+
+    rows = db.session.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].sort_value, rows[-1].User.uid)
+
+    return [
+        (row.User, {
+            "order_count": row.order_count,
+            "total_spent": float(row.total_spent),
+            "last_order_at": row.last_order_at,
+            "payment_status": {"Paid": row.paid, "Pending": row.pending}
+        })
+        for row in rows
+    ], next_cursor
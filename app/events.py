@@ -0,0 +1,192 @@
+"""Server-sent events for order and payment status changes.
+
+Whenever an order is created or changes status, or a transaction is
+created or changes payment status, a row is written to ``order_events``
+in the same flush and announced through app/notify.py. Each worker keeps
+the open streams of its users in memory and pushes matching events to
+them: the worker that wrote the event right after commit, the others when
+their change listener receives it. A reconnecting client sends
+``Last-Event-ID`` and gets what it missed from the table.
+
+Streams hold a worker for as long as they are open, so serve them from an
+async worker (``gunicorn -k gevent``) or a dedicated process that only
+receives ``/events/...`` traffic.
+"""
+import json
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import delete, event, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .model import Order, OrderEvent, Transaction
+from .notify import on_change, publish
+
+events_bp = Blueprint('events', __name__)
+
+
+class EventHub:
+    """Per-process registry of open streams, keyed by user id."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscriber = queue.Queue(maxsize=1000)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(payload)
+            except queue.Full:
+                # A stuck client; it will catch up from the table when it reconnects
+                pass
+
+
+hub = EventHub()
+
+
+def _status_changed(obj, attribute):
+    return inspect(obj).attrs[attribute].history.has_changes()
+
+
+def _record_order_events(session, flush_context):
+    """Write an order_events row for every order/payment status change in this flush."""
+    rows = []
+    for obj in list(session.new) + list(session.dirty):
+        created = obj in session.new
+        if isinstance(obj, Order) and (created or _status_changed(obj, 'status')):
+            rows.append({"user_id": obj.user_id, "entity": 'order', "entity_id": obj.id,
+                         "order_id": obj.id, "status": obj.status_label})
+        elif isinstance(obj, Transaction) and (created or _status_changed(obj, 'payment_status')):
+            rows.append({"user_id": obj.user_id, "entity": 'transaction', "entity_id": obj.id,
+                         "order_id": obj.order_id, "status": obj.payment_status})
+    if not rows:
+        return
+
+    now = datetime.utcnow()
+    for row in rows:
+        row["created_at"] = now
+    result = session.connection().execute(
+        insert(OrderEvent).returning(OrderEvent.id, sort_by_parameter_order=True), rows
+    )
+    for row, event_id in zip(rows, result.scalars()):
+        # Delivered on this worker right after commit and on the others by their listeners;
+        # the echo from this worker's own listener is skipped by the streams (see ``seen``)
+        publish(
+            session, 'order_event', event_id,
+            user_id=row["user_id"], type=row["entity"], event_entity_id=row["entity_id"],
+            order_id=row["order_id"], status=row["status"], created_at=now.isoformat()
+        )
+
+
+@on_change('order_event')
+def deliver_order_event(message):
+    if message['id'] is not None:
+        hub.publish(message['user_id'], {
+            "id": message['id'],
+            "type": message['type'],
+            # Sent as event_entity_id, since publish() takes entity_id itself
+            "entity_id": message['event_entity_id'],
+            "order_id": message['order_id'],
+            "status": message['status'],
+            "created_at": message['created_at']
+        })
+
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: {payload['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+def missed_events(user_id, last_event_id):
+    """Events after ``last_event_id`` for a reconnecting client."""
+    stmt = (
+        select(OrderEvent)
+        .where(OrderEvent.user_id == user_id, OrderEvent.id > last_event_id)
+        .order_by(OrderEvent.id)
+        .limit(current_app.config['SSE_REPLAY_LIMIT'])
+    )
+    return [order_event.to_dict() for order_event in db.session.execute(stmt).scalars()]
+
+
+def prune_order_events(days):
+    """Delete events older than ``days``; reconnecting clients never need them."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    db.session.execute(delete(OrderEvent).where(OrderEvent.created_at < cutoff))
+
+
+# Stream the current user's order and payment status changes.
+# EventSource can't set headers, so the JWT may also be passed as ?jwt=...
+@events_bp.route('/events/orders', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def order_events_stream():
+    user_id = get_jwt_identity()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    heartbeat = current_app.config['SSE_HEARTBEAT_INTERVAL']
+    retry_ms = current_app.config['SSE_RETRY_MS']
+
+    # Subscribe before replaying so nothing committed in between is lost
+    subscriber = hub.subscribe(user_id)
+    try:
+        backlog = missed_events(user_id, last_event_id) if last_event_id is not None else []
+    except Exception:
+        hub.unsubscribe(user_id, subscriber)
+        raise
+    finally:
+        # Don't hold a pooled connection for the lifetime of the stream
+        db.session.remove()
+
+    def stream():
+        # Events replayed from the table may also arrive live; skip repeats
+        seen = deque(maxlen=1000)
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            for payload in backlog:
+                seen.append(payload['id'])
+                yield format_event(payload)
+            while True:
+                try:
+                    payload = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if payload['id'] in seen:
+                    continue
+                seen.append(payload['id'])
+                yield format_event(payload)
+        finally:
+            hub.unsubscribe(user_id, subscriber)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def init_app(app):
+    if not event.contains(Session, 'after_flush', _record_order_events):
+        event.listen(Session, 'after_flush', _record_order_events)
+    app.register_blueprint(events_bp)
@@ -0,0 +1,58 @@
+"""Sparse fieldsets: ``?fields=name,price,image_url``.
+
+Models that support it declare ``FIELD_SOURCES`` (serialized field -> the
+column, or ``(relationship, column)``, it is read from) and accept
+``to_dict(fields=...)``. ``projection()`` turns the requested fields into
+``load_only``/``joinedload`` options so unrequested columns are never
+selected, and related rows are only joined when one of their fields is
+asked for.
+"""
+from flask import request, jsonify, abort, make_response
+from sqlalchemy.orm import joinedload, load_only
+
+
+def parse_fields(model):
+    """Return the list of requested fields, or None when ``fields`` is absent."""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in model.FIELD_SOURCES]
+    if unknown:
+        abort(make_response(jsonify({
+            "error": f"Unknown fields: {', '.join(unknown)}",
+            "allowed_fields": list(model.FIELD_SOURCES)
+        }), 400))
+    return fields
+
+
+def projection(model, fields=None):
+    """Loader options reading only what ``model.to_dict(fields)`` needs."""
+    sources = [model.FIELD_SOURCES[field] for field in (fields or model.FIELD_SOURCES)]
+    # The primary key is always needed to build the instance
+    primary_key = [getattr(model, column.key) for column in model.__mapper__.primary_key]
+    columns = primary_key + [getattr(model, source) for source in sources if isinstance(source, str)]
+
+    related = {}
+    for source in sources:
+        if not isinstance(source, str):
+            relationship, column = source
+            related.setdefault(relationship, []).append(column)
+
+    options = [] if fields is None else [load_only(*columns)]
+    for relationship, related_columns in related.items():
+        attribute = getattr(model, relationship)
+        target = attribute.property.mapper.class_
+        loader = joinedload(attribute)
+        if fields is not None:
+            loader = loader.load_only(*(getattr(target, column) for column in related_columns))
+        options.append(loader)
+    return options
+
+
+def narrow(data, fields):
+    """Trim an already serialized (e.g. cached) dict down to ``fields``."""
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields}
@@ -0,0 +1,132 @@
+"""Replenishment forecast: which products will run out, and how much to reorder.
+
+One query pulls units sold per product per day over the history window
+(``order_items`` is partitioned on ``created_at``, so only recent months
+are scanned). The daily series are laid out as a products x days NumPy
+array, and velocity, days of cover and reorder quantities are computed for
+every product at once.
+
+Velocity is the larger of the short and long moving averages of daily
+sales, so a product whose sales are picking up is not judged by its
+quieter past. A product is recommended for reorder when its stock covers
+fewer than ``lead time + target cover`` days; the quantity brings it back
+up to that many days of sales.
+
+Results replace the contents of ``reorder_recommendations``, which the
+admin endpoint serves grouped by supplier.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, select
+
+from . import db
+from .model import OrderItem, Product, ReorderRecommendation
+
+forecast_cli = AppGroup('forecast', help="Sales forecasting reports.")
+
+
+def daily_sales(start):
+    """``(product_id, day, units)`` rows for every product sold since ``start``."""
+    day = func.date_trunc('day', OrderItem.created_at).label('day')
+    return db.session.execute(
+        select(OrderItem.product_id, day, func.sum(OrderItem.quantity).label('units'))
+        .where(OrderItem.created_at >= start)
+        .group_by(OrderItem.product_id, day)
+    ).all()
+
+
+def compute_recommendations(product_ids, stock, sales, start, history_days,
+                            short_window, lead_time_days, target_cover_days):
+    """Vectorized forecast.
+
+    ``product_ids`` and ``stock`` are parallel sequences; ``sales`` are
+    ``(product_id, day, units)`` rows. Returns ``(product index, velocity,
+    days of cover, reorder quantity)`` for products needing reorder.
+    """
+    # Imported here so web workers that never run the forecast don't pay for it at start-up
+    import numpy as np
+
+    if not len(product_ids):
+        return []
+
+    index = {product_id: i for i, product_id in enumerate(product_ids)}
+    units = np.zeros((len(product_ids), history_days))
+    rows = [(index[product_id], (day.date() if isinstance(day, datetime) else day) - start, quantity)
+            for product_id, day, quantity in sales if product_id in index]
+    if rows:
+        product_idx, day_offsets, quantities = zip(*rows)
+        day_idx = np.array([offset.days for offset in day_offsets])
+        in_window = (day_idx >= 0) & (day_idx < history_days)
+        np.add.at(
+            units,
+            (np.array(product_idx)[in_window], day_idx[in_window]),
+            np.array(quantities, dtype=float)[in_window]
+        )
+
+    long_average = units.mean(axis=1)
+    short_average = units[:, -short_window:].mean(axis=1)
+    velocity = np.maximum(long_average, short_average)
+
+    stock = np.asarray(stock, dtype=float)
+    selling = velocity > 0
+    days_of_cover = np.full(len(product_ids), np.inf)
+    np.divide(stock, velocity, out=days_of_cover, where=selling)
+
+    horizon = lead_time_days + target_cover_days
+    reorder_quantity = np.ceil(np.maximum(velocity * horizon - stock, 0))
+    needs_reorder = selling & (days_of_cover < horizon) & (reorder_quantity > 0)
+
+    return [
+        (int(i), float(velocity[i]), float(days_of_cover[i]), int(reorder_quantity[i]))
+        for i in np.flatnonzero(needs_reorder)
+    ]
+
+
+def run_replenishment(today=None):
+    """Recompute ``reorder_recommendations``; returns the number of products flagged."""
+    config = current_app.config
+    history_days = config['FORECAST_HISTORY_DAYS']
+    today = today or date.today()
+    start = today - timedelta(days=history_days - 1)
+
+    products = db.session.execute(
+        select(Product.id, Product.supplier_id, Product.stock_quantity).where(Product.status == 'active')
+    ).all()
+    sales = daily_sales(datetime.combine(start, datetime.min.time()))
+
+    flagged = compute_recommendations(
+        [product.id for product in products],
+        [product.stock_quantity for product in products],
+        sales, start, history_days,
+        short_window=config['FORECAST_SHORT_WINDOW_DAYS'],
+        lead_time_days=config['FORECAST_LEAD_TIME_DAYS'],
+        target_cover_days=config['FORECAST_TARGET_COVER_DAYS']
+    )
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "product_id": products[i].id,
+            "supplier_id": products[i].supplier_id,
+            "stock_quantity": products[i].stock_quantity,
+            "daily_velocity": round(velocity, 3),
+            "days_of_cover": round(cover, 1),
+            "reorder_quantity": quantity,
+            "computed_at": now
+        }
+        for i, velocity, cover, quantity in flagged
+    ]
+    db.session.execute(delete(ReorderRecommendation))
+    if rows:
+        db.session.execute(insert(ReorderRecommendation), rows)
+    db.session.commit()
+    return len(rows)
+
+
+@forecast_cli.command("replenishment")
+def replenishment_command():
+    """Recompute low-stock reorder recommendations."""
+    flagged = run_replenishment()
+    print(f"{flagged} products need reordering.")
@@ -0,0 +1,167 @@
+"""``Idempotency-Key`` support for POST endpoints that create records.
+
+The first request carrying a key claims ``(user, key)`` in
+``idempotency_keys``, runs the view and stores its response. Retries with the
+same key get the stored response back (marked ``Idempotent-Replayed: true``)
+instead of running the view again. A retry that arrives while the first
+request is still running waits for it to finish. The key only covers the exact
+same request: reusing it with a different path or body is rejected with 422.
+
+Claims and results are written on their own short transactions, outside
+the request's session, so a concurrent duplicate sees the claim straight
+away. Server errors release the key, so the client can retry. Keys expire
+after ``IDEMPOTENCY_KEY_TTL`` seconds; the ``expire_idempotency_keys`` job
+deletes them.
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from . import db
+from .model import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def fingerprint():
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.path.encode(), request.get_data()):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def claim(user_id, key, request_fingerprint):
+    """Claim ``(user_id, key)``; returns True when this request should run the view.
+
+    An expired key, or one whose first request died without finishing, is taken over.
+    """
+    config = current_app.config
+    now = datetime.utcnow()
+    stmt = insert(IdempotencyKey).values(
+        user_id=user_id, key=key, fingerprint=request_fingerprint,
+        locked_at=now, expires_at=now + timedelta(seconds=config['IDEMPOTENCY_KEY_TTL'])
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={
+            "fingerprint": stmt.excluded.fingerprint,
+            "status_code": None,
+            "response_body": None,
+            "mimetype": None,
+            "locked_at": stmt.excluded.locked_at,
+            "expires_at": stmt.excluded.expires_at
+        },
+        where=or_(
+            IdempotencyKey.expires_at < now,
+            and_(
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.fingerprint == stmt.excluded.fingerprint,
+                IdempotencyKey.locked_at < now - timedelta(seconds=config['IDEMPOTENCY_LOCK_TIMEOUT'])
+            )
+        )
+    ).returning(IdempotencyKey.key)
+    with db.engine.begin() as connection:
+        return connection.execute(stmt).first() is not None
+
+
+def load(user_id, key):
+    with db.engine.connect() as connection:
+        return connection.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status_code,
+                   IdempotencyKey.response_body, IdempotencyKey.mimetype)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).first()
+
+
+def store(user_id, key, response):
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(status_code=response.status_code,
+                    response_body=response.get_data(as_text=True),
+                    mimetype=response.mimetype)
+        )
+
+
+def release(user_id, key):
+    with db.engine.begin() as connection:
+        connection.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        )
+
+
+def replay(record):
+    response = Response(record.response_body, status=record.status_code, mimetype=record.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def wait_for(user_id, key, request_fingerprint):
+    """Wait for the request holding the key to finish; returns the response to send."""
+    deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_TIMEOUT']
+    delay = 0.05
+    while True:
+        record = load(user_id, key)
+        if record is None:
+            # The first request failed and released the key; run this one instead
+            if claim(user_id, key, request_fingerprint):
+                return None
+            continue
+        if record.fingerprint != request_fingerprint:
+            return make_response(jsonify({
+                "error": f"{HEADER} was already used for a different request"
+            }), 422)
+        if record.status_code is not None:
+            return replay(record)
+        if time.monotonic() >= deadline:
+            response = make_response(jsonify({
+                "error": f"A request with this {HEADER} is still being processed"
+            }), 409)
+            response.headers['Retry-After'] = '1'
+            return response
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def idempotent(view):
+    """Make a (JWT-protected) view replay its first response for a repeated ``Idempotency-Key``."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"error": f"{HEADER} must be at most 255 characters"}), 400
+
+        user_id = get_jwt_identity()
+        request_fingerprint = fingerprint()
+        if not claim(user_id, key, request_fingerprint):
+            response = wait_for(user_id, key, request_fingerprint)
+            if response is not None:
+                return response
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            release(user_id, key)
+            raise
+        if response.status_code >= 500:
+            release(user_id, key)
+        else:
+            store(user_id, key, response)
+        return response
+    return wrapper
+
+
+def expire_keys():
+    """Delete expired keys; returns how many were removed."""
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow()))
+    return result.rowcount
@@ -0,0 +1,165 @@
+"""Stock reservations for carts in checkout.
+
+A product's available stock is ``stock_quantity`` minus the quantities of
+its active holds and of its paid-but-unsettled sales (``converted``
+reservations). Checkout never writes ``products`` rows:
+
+* ``place_holds`` reserves a whole cart with one ``INSERT ... SELECT``. It
+  places every hold if all lines fit, and none otherwise. Carts that share
+  a product are serialized on a per-product advisory lock, not on the
+  product row, so reads and admin edits of the product never wait.
+* ``convert_holds`` (payment marked Paid) only updates the buyer's own
+  reservation rows.
+* ``sweep`` (the ``sweep_reservations`` job) releases expired holds. It
+  also folds converted reservations into ``stock_quantity`` in one
+  ``UPDATE`` per run, so a hot product is written once per sweep and not
+  once per sale.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+
+from . import db
+from .notify import publish
+
+# First key of the two-key advisory locks taken per product while placing holds
+HOLD_LOCK_NAMESPACE = 41041
+
+_LOCK_PRODUCTS = text("""
+SELECT pg_advisory_xact_lock(:namespace, product_id)
+FROM (SELECT DISTINCT unnest(CAST(:product_ids AS integer[])) AS product_id ORDER BY 1) ids
+""")
+
+# Available stock, not counting the user's own hold (which a new hold replaces)
+_AVAILABLE = """
+SELECT p.id AS product_id,
+       p.stock_quantity - COALESCE(sum(r.quantity) FILTER (
+           WHERE r.status = 'converted'
+              OR (r.status = 'held' AND r.expires_at > :now AND r.user_id <> :user_id)
+       ), 0) AS available
+FROM products p
+LEFT JOIN reservations r ON r.product_id = p.id AND r.status IN ('held', 'converted')
+WHERE p.id = ANY(CAST(:product_ids AS integer[])) AND p.status = 'active'
+GROUP BY p.id, p.stock_quantity
+"""
+
+_PLACE_HOLDS = text(f"""
+WITH cart AS (
+    SELECT * FROM unnest(CAST(:product_ids AS integer[]), CAST(:quantities AS integer[])) AS c(product_id, quantity)
+),
+available AS ({_AVAILABLE}),
+short AS (
+    SELECT cart.product_id FROM cart LEFT JOIN available a ON a.product_id = cart.product_id
+    WHERE a.available IS NULL OR a.available < cart.quantity
+)
+INSERT INTO reservations (product_id, user_id, quantity, status, expires_at, created_at, updated_at)
+SELECT product_id, :user_id, quantity, 'held', :expires_at, :now, :now FROM cart
+WHERE NOT EXISTS (SELECT 1 FROM short)
+ON CONFLICT (product_id, user_id) WHERE status = 'held'
+DO UPDATE SET quantity = excluded.quantity, expires_at = excluded.expires_at, updated_at = excluded.updated_at
+RETURNING product_id
+""")
+
+_RELEASE_OTHER_HOLDS = text("""
+UPDATE reservations SET status = 'released', updated_at = :now
+WHERE user_id = :user_id AND status = 'held' AND product_id <> ALL(CAST(:product_ids AS integer[]))
+""")
+
+_CONVERT = text("""
+UPDATE reservations SET status = 'converted', order_id = :order_id, updated_at = :now
+WHERE user_id = :user_id AND status = 'held'
+  AND product_id IN (SELECT product_id FROM order_items WHERE order_id = :order_id)
+RETURNING product_id
+""")
+
+_RELEASE_EXPIRED = text("""
+UPDATE reservations SET status = 'released', updated_at = :now
+WHERE status = 'held' AND expires_at <= :now
+""")
+
+_SETTLE = text("""
+WITH settled AS (
+    UPDATE reservations SET status = 'settled', updated_at = :now
+    WHERE status = 'converted'
+    RETURNING product_id, quantity
+)
+UPDATE products p SET stock_quantity = p.stock_quantity - s.quantity, updated_at = :now
+FROM (SELECT product_id, sum(quantity) AS quantity FROM settled GROUP BY product_id) s
+WHERE p.id = s.product_id
+RETURNING p.id
+""")
+
+_PURGE = text("""
+DELETE FROM reservations WHERE status IN ('released', 'settled') AND updated_at < :cutoff
+""")
+
+
+class InsufficientStock(Exception):
+    """Some cart lines can't be held; ``shortages`` maps product id to what is available."""
+
+    def __init__(self, shortages):
+        super().__init__("Insufficient stock")
+        self.shortages = shortages
+
+
+def available_stock(product_ids, user_id=None):
+    """``{product_id: available quantity}`` for active products."""
+    rows = db.session.execute(text(_AVAILABLE), {
+        "product_ids": list(product_ids), "user_id": user_id or 0, "now": datetime.utcnow()
+    })
+    return {row.product_id: row.available for row in rows}
+
+
+def place_holds(user_id, lines):
+    """Hold ``[(product_id, quantity)]`` for ``user_id``, all or nothing; the caller commits.
+
+    Replaces the user's previous holds. Returns the hold expiry time.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=current_app.config['RESERVATION_HOLD_SECONDS'])
+    product_ids = [product_id for product_id, _ in lines]
+    params = {
+        "user_id": user_id,
+        "product_ids": product_ids,
+        "quantities": [quantity for _, quantity in lines],
+        "now": now,
+        "expires_at": expires_at
+    }
+
+    db.session.execute(_LOCK_PRODUCTS, {"namespace": HOLD_LOCK_NAMESPACE, "product_ids": product_ids})
+    held = db.session.execute(_PLACE_HOLDS, params).scalars().all()
+    if not held:
+        available = available_stock(product_ids, user_id)
+        db.session.rollback()
+        raise InsufficientStock({
+            product_id: max(available.get(product_id, 0), 0)
+            for product_id, quantity in lines
+            if available.get(product_id, 0) < quantity
+        })
+    db.session.execute(_RELEASE_OTHER_HOLDS, params)
+    return expires_at
+
+
+def release_holds(user_id):
+    """Give back every active hold of ``user_id``; the caller commits."""
+    db.session.execute(text(
+        "UPDATE reservations SET status = 'released', updated_at = :now WHERE user_id = :user_id AND status = 'held'"
+    ), {"user_id": user_id, "now": datetime.utcnow()})
+
+
+def convert_holds(user_id, order_id):
+    """Turn the user's holds on the order's products into sales; the caller commits."""
+    return len(db.session.execute(_CONVERT, {
+        "user_id": user_id, "order_id": order_id, "now": datetime.utcnow()
+    }).scalars().all())
+
+
+def sweep():
+    """Release expired holds, settle converted ones into stock and purge old rows."""
+    now = datetime.utcnow()
+    db.session.execute(_RELEASE_EXPIRED, {"now": now})
+    for product_id in db.session.execute(_SETTLE, {"now": now}).scalars():
+        # Raw SQL skips the ORM flush hooks, so announce the stock change for cache eviction
+        publish(db.session, 'product', product_id)
+    db.session.execute(_PURGE, {"cutoff": now - timedelta(days=1)})
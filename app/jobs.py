@@ -0,0 +1,166 @@
+"""Durable background job queue backed by the ``jobs`` table.
+
+Request handlers call ``enqueue()`` and commit as usual; the job row is
+written in the same transaction as the rest of the request, so a job is
+only visible to workers once the work that produced it is committed.
+
+Workers (``flask worker``) claim jobs with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` so any number of worker threads and processes can poll the same
+table without handing out a job twice.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from . import db
+from .model import Job
+
+# Registered job handlers, keyed by job name
+_handlers = {}
+
+
+def job(name):
+    """Register the decorated function as the handler for jobs called ``name``."""
+    def decorator(fn):
+        _handlers[name] = fn
+        return fn
+    return decorator
+
+
+def enqueue(name, delay=None, max_attempts=None, **payload):
+    """Add a job to the current session; it is queued when the session commits."""
+    new_job = Job(
+        name=name,
+        payload=payload,
+        status='queued',
+        attempts=0,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + (delay or timedelta(0))
+    )
+    db.session.add(new_job)
+    return new_job
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for a job that has failed ``attempts`` times."""
+    base = current_app.config['JOB_RETRY_BACKOFF']
+    cap = current_app.config['JOB_RETRY_BACKOFF_MAX']
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def fail_abandoned_jobs(stale):
+    """Fail running jobs whose worker died on their last attempt; returns how many."""
+    return db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_at < stale, Job.attempts >= Job.max_attempts)
+        .values(status='failed', locked_at=None, last_error="Worker stopped responding on the last attempt")
+    ).rowcount
+
+
+def claim_job():
+    """Lock and mark the next runnable job as running, or return None."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['JOB_LOCK_TIMEOUT'])
+    if fail_abandoned_jobs(stale):
+        db.session.commit()
+    stmt = (
+        select(Job)
+        .where(
+            or_(
+                and_(Job.status == 'queued', Job.run_at <= now),
+                # Jobs whose worker died mid-run are picked up again while they have attempts left
+                and_(Job.status == 'running', Job.locked_at < stale, Job.attempts < Job.max_attempts)
+            )
+        )
+        .order_by(Job.run_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.session.execute(stmt).scalar_one_or_none()
+    if claimed is None:
+        db.session.rollback()
+        return None
+
+    claimed.status = 'running'
+    claimed.locked_at = now
+    claimed.attempts += 1
+    db.session.commit()
+    return claimed
+
+
+def run_job(claimed):
+    """Run a claimed job and record the outcome, rescheduling it on failure."""
+    handler = _handlers.get(claimed.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{claimed.name}'")
+        handler(**claimed.payload)
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.exception("Job %s (%s) failed", claimed.id, claimed.name)
+        claimed = db.session.get(Job, claimed.id)
+        claimed.last_error = f"{type(exc).__name__}: {exc}"
+        claimed.locked_at = None
+        if claimed.attempts < claimed.max_attempts:
+            claimed.status = 'queued'
+            claimed.run_at = datetime.utcnow() + retry_delay(claimed.attempts)
+        else:
+            claimed.status = 'failed'
+        db.session.commit()
+        return False
+
+    claimed.status = 'done'
+    claimed.locked_at = None
+    claimed.last_error = None
+    db.session.commit()
+    return True
+
+
+def work(app, stop_event, poll_interval, burst=False):
+    """Worker thread loop: claim and run jobs until ``stop_event`` is set."""
+    while not stop_event.is_set():
+        with app.app_context():
+            claimed = claim_job()
+            if claimed is not None:
+                run_job(claimed)
+                continue
+        if burst:
+            return
+        stop_event.wait(poll_interval)
+
+
+def run_worker(app, concurrency=None, poll_interval=None, burst=False):
+    """Run ``concurrency`` worker threads until interrupted (or the queue drains in burst mode)."""
+    # Importing the task module registers its handlers
+    from . import tasks  # noqa: F401
+
+    concurrency = concurrency or app.config['JOB_CONCURRENCY']
+    poll_interval = poll_interval or app.config['JOB_POLL_INTERVAL']
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(app, stop_event, poll_interval, burst),
+            name=f"job-worker-{i}",
+            daemon=True
+        )
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        app.logger.info("Stopping job workers...")
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
@@ -19,16 +19,28 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            "uid": self.uid,
-            "name": self.name,
-            "email": self.email,
-            "phone": self.phone,
-            "is_admin": self.is_admin,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
+    # Serialized field -> column it is read from (see app/fields.py)
+    FIELD_SOURCES = {
+        "uid": "uid",
+        "name": "name",
+        "email": "email",
+        "phone": "phone",
+        "is_admin": "is_admin",
+        "created_at": "created_at",
+        "updated_at": "updated_at"
+    }
+
+    def to_dict(self, fields=None):
+        serializers = {
+            "uid": lambda: self.uid,
+            "name": lambda: self.name,
+            "email": lambda: self.email,
+            "phone": lambda: self.phone,
+            "is_admin": lambda: self.is_admin,
+            "created_at": lambda: self.created_at,
+            "updated_at": lambda: self.updated_at
         }
+        return {field: serializers[field]() for field in (fields or serializers)}
 
 # Category model
 class Category(db.Model):
@@ -52,15 +64,26 @@ class Supplier(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "contact_info": self.contact_info,
-            "address": self.address,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
+    # Serialized field -> column it is read from (see app/fields.py)
+    FIELD_SOURCES = {
+        "id": "id",
+        "name": "name",
+        "contact_info": "contact_info",
+        "address": "address",
+        "created_at": "created_at",
+        "updated_at": "updated_at"
+    }
+
+    def to_dict(self, fields=None):
+        serializers = {
+            "id": lambda: self.id,
+            "name": lambda: self.name,
+            "contact_info": lambda: self.contact_info,
+            "address": lambda: self.address,
+            "created_at": lambda: self.created_at,
+            "updated_at": lambda: self.updated_at
         }
+        return {field: serializers[field]() for field in (fields or serializers)}
 
 # Product model
 class Product(db.Model):
@@ -81,22 +104,40 @@ class Product(db.Model):
     category = db.relationship('Category', backref='products')
     supplier = db.relationship('Supplier', backref='products')
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "price": float(self.price),
-            "purchase_price": float(self.purchase_price),
-            "stock_quantity": self.stock_quantity,
-            "image_url": self.image_url,
-            "category_id": self.category_id,
-             'category_name': self.category.name,
-            "supplier_id": self.supplier_id,
-            "supplier_name": self.supplier.name,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
+    # Serialized field -> column it is read from, or (relationship, column) (see app/fields.py)
+    FIELD_SOURCES = {
+        "id": "id",
+        "name": "name",
+        "description": "description",
+        "price": "price",
+        "purchase_price": "purchase_price",
+        "stock_quantity": "stock_quantity",
+        "image_url": "image_url",
+        "category_id": "category_id",
+        "category_name": ("category", "name"),
+        "supplier_id": "supplier_id",
+        "supplier_name": ("supplier", "name"),
+        "created_at": "created_at",
+        "updated_at": "updated_at"
+    }
+
+    def to_dict(self, fields=None):
+        serializers = {
+            "id": lambda: self.id,
+            "name": lambda: self.name,
+            "description": lambda: self.description,
+            "price": lambda: float(self.price),
+            "purchase_price": lambda: float(self.purchase_price),
+            "stock_quantity": lambda: self.stock_quantity,
+            "image_url": lambda: self.image_url,
+            "category_id": lambda: self.category_id,
+            "category_name": lambda: self.category.name,
+            "supplier_id": lambda: self.supplier_id,
+            "supplier_name": lambda: self.supplier.name,
+            "created_at": lambda: self.created_at,
+            "updated_at": lambda: self.updated_at
         }
+        return {field: serializers[field]() for field in (fields or serializers)}
 
 # Order model
 class Order(db.Model):
@@ -105,22 +146,32 @@ class Order(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.uid'), nullable=False)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.Enum(OrderStatus), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Partition key: orders is range-partitioned by month on created_at (see app/partitions.py)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = db.relationship('User', backref='orders')
 
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
             "user_id": self.user_id,
             "username": self.user.name,
             "total_amount": float(self.total_amount),
-            "status": self.status,
+            "status": self.status_label,
             "created_at": self.created_at,
             "updated_at": self.updated_at
         }
 
+    @property
+    def status_label(self):
+        # Enum members aren't JSON serializable; expose their value ("Pending", "Shipped", ...)
+        return self.status.value if isinstance(self.status, OrderStatus) else self.status
+
 # OrderItem model
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
@@ -130,16 +181,25 @@ class OrderItem(db.Model):
         db.ForeignKey('users.uid', name='fk_orderitem_user_id'),
         nullable=False
     )
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    # Partitioned tables can't be referenced by a foreign key on id alone, so there
+    # is no constraint; the relationship below names the join itself.
+    order_id = db.Column(db.Integer, nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Partition key: order_items is range-partitioned by month on created_at
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    order = db.relationship('Order', backref='items')
+    order = db.relationship('Order', primaryjoin='OrderItem.order_id == Order.id',
+                            foreign_keys=[order_id], backref='items')
     product = db.relationship('Product', backref='order_items')
 
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -148,7 +208,7 @@ class OrderItem(db.Model):
             "product_name": self.product.name,
             "product_image": self.product.image_url,
             "quantity": self.quantity,
-            "status": self.order.status,
+            "status": self.order.status_label,
             "supplier": self.product.supplier.name,
             "price": float(self.price),
             "created_at": self.created_at,
@@ -159,11 +219,8 @@ class OrderItem(db.Model):
 class Transaction(db.Model):
     __tablename__ = 'transactions'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    order_id = db.Column(
-        db.Integer,
-        db.ForeignKey('orders.id', name='fk_transactions_order_id'),
-        nullable=False
-    )
+    # No foreign key constraint since orders is partitioned (see OrderItem.order_id)
+    order_id = db.Column(db.Integer, nullable=False)
     user_id = db.Column(
         db.Integer,
         db.ForeignKey('users.uid', name='fk_transactions_user_id'),
@@ -180,10 +237,17 @@ class Transaction(db.Model):
         db.Enum('Pending', 'Paid', name='enum_payment_status'),
         nullable=False
     )
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Partition key: transactions is range-partitioned by month on created_at
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    order = db.relationship('Order', backref='transaction')
+    order = db.relationship('Order', primaryjoin='Transaction.order_id == Order.id',
+                            foreign_keys=[order_id], backref='transaction')
+
+    __table_args__ = (
+        db.Index('ix_transactions_order_id', 'order_id'),
+        db.Index('ix_transactions_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     def to_dict(self):
         return {
@@ -227,3 +291,184 @@ class Cart(db.Model):
             "created_at": self.created_at,
             "updated_at": self.updated_at
         }
+
+
+# Job model (background job queue, see app/jobs.py)
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    # SQLite only autoincrements INTEGER primary keys (used by the tests)
+    id = db.Column(db.BigInteger().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True)
+    name = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), default='queued', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_at": self.run_at,
+            "last_error": self.last_error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+# OrderEvent model (order/payment status changes streamed over SSE, see app/events.py)
+class OrderEvent(db.Model):
+    __tablename__ = 'order_events'
+    # SQLite only autoincrements INTEGER primary keys (used by the tests)
+    id = db.Column(db.BigInteger().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # 'order' or 'transaction'
+    entity_id = db.Column(db.Integer, nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_order_events_user_id_id', 'user_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.entity,
+            "entity_id": self.entity_id,
+            "order_id": self.order_id,
+            "status": self.status,
+            "created_at": self.created_at
+        }
+
+# ReorderRecommendation model (written by the replenishment forecast, see app/forecasting.py)
+class ReorderRecommendation(db.Model):
+    __tablename__ = 'reorder_recommendations'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False, unique=True)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id', ondelete='CASCADE'), nullable=False, index=True)
+    stock_quantity = db.Column(db.Integer, nullable=False)
+    daily_velocity = db.Column(db.Numeric(12, 3), nullable=False)
+    days_of_cover = db.Column(db.Numeric(12, 1), nullable=False)
+    reorder_quantity = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    product = db.relationship('Product')
+    supplier = db.relationship('Supplier')
+
+    def to_dict(self):
+        return {
+            "product_id": self.product_id,
+            "product_name": self.product.name,
+            "stock_quantity": self.stock_quantity,
+            "daily_velocity": float(self.daily_velocity),
+            "days_of_cover": float(self.days_of_cover),
+            "reorder_quantity": self.reorder_quantity,
+            "computed_at": self.computed_at
+        }
+
+
+# Product co-occurrence counts and top-K "frequently bought together" lists (see app/recommendations.py)
+class ProductPair(db.Model):
+    __tablename__ = 'product_pairs'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False)  # orders containing both products
+
+
+class ProductRecommendation(db.Model):
+    __tablename__ = 'product_recommendations'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.SmallInteger, primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    orders = db.Column(db.Integer, nullable=False)
+
+
+# High-water marks for incremental jobs
+class JobWatermark(db.Model):
+    __tablename__ = 'job_watermarks'
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.DateTime, nullable=False)
+
+
+# Idempotency-Key records for retried POSTs (see app/idempotency.py)
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    user_id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=True)  # NULL while the first request is running
+    response_body = db.Column(db.Text, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+# Issued access tokens, so they can be revoked (see app/revocation.py).
+# No foreign key to users: a deleted user's revoked tokens must stay listed.
+class AuthToken(db.Model):
+    __tablename__ = 'auth_tokens'
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Stock held for a user's checkout (see app/inventory.py)
+class Reservation(db.Model):
+    __tablename__ = 'reservations'
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.uid', ondelete='CASCADE'), nullable=False)
+    order_id = db.Column(db.Integer, nullable=True)  # set on conversion
+    quantity = db.Column(db.Integer, nullable=False)
+    # held -> converted (paid, not yet taken off stock_quantity) -> settled; or held -> released
+    status = db.Column(db.String(20), default='held', nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # One active hold per product and user
+        db.Index('uq_reservations_product_id_user_id_held', 'product_id', 'user_id', unique=True,
+                 postgresql_where=db.text("status = 'held'")),
+        # Holds and unsettled sales that count against a product's stock
+        db.Index('ix_reservations_product_id_active', 'product_id',
+                 postgresql_where=db.text("status IN ('held', 'converted')")),
+        db.Index('ix_reservations_user_id_status', 'user_id', 'status'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "product_id": self.product_id,
+            "order_id": self.order_id,
+            "quantity": self.quantity,
+            "status": self.status,
+            "expires_at": self.expires_at,
+            "created_at": self.created_at
+        }
+
+
+# Shared token buckets for rate limiting (only with ADMISSION_RATE_LIMIT_BACKEND = 'postgres', see app/admission.py)
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    # Losing the buckets on a crash only resets the limits, so skip the WAL
+    __table_args__ = {'prefixes': ['UNLOGGED']}
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    admitted = db.Column(db.Boolean, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
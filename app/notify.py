@@ -0,0 +1,238 @@
+"""Cross-worker change notifications over Postgres LISTEN/NOTIFY.
+
+Every flush that inserts, updates or deletes a tracked model publishes
+``{"entity": ..., "id": ...}`` with ``pg_notify`` on the same connection.
+Postgres only delivers notifications when the transaction commits (and
+drops them on rollback), so listeners never hear about changes that
+didn't happen.
+
+Each web worker runs one listener thread (started on its first request)
+that receives these messages and calls the handlers registered with
+``on_change``; the cache handlers below evict in-process entries. The
+worker that made the change also runs them locally right after commit, so
+it never serves its own stale data.
+"""
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from . import db
+from .cache import catalog_cache, role_cache
+from .model import User, Category, Product, Supplier
+
+logger = logging.getLogger(__name__)
+
+# Models whose changes are broadcast, and the entity name used on the wire
+TRACKED_MODELS = {
+    Product: 'product',
+    Category: 'category',
+    Supplier: 'supplier',
+    User: 'user',
+}
+
+# entity name -> callbacks taking the message dict (an id of None means "anything may have changed")
+_handlers = {}
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+# Process id while its listener holds a LISTEN connection (compared with os.getpid() after a fork)
+_listening_pid = None
+
+
+def on_change(entity):
+    """Register the decorated function to run when an ``entity`` row changes on any worker."""
+    def decorator(fn):
+        _handlers.setdefault(entity, []).append(fn)
+        return fn
+    return decorator
+
+
+def dispatch(message):
+    for handler in _handlers.get(message['entity'], ()):
+        try:
+            handler(message)
+        except Exception:
+            logger.exception("Change handler for %s %s failed", message['entity'], message.get('id'))
+
+
+def dispatch_all():
+    """Run every handler with id None, e.g. after notifications may have been missed."""
+    for entity in list(_handlers):
+        dispatch({"entity": entity, "id": None})
+
+
+def publish(session, entity, entity_id, local=True, **data):
+    """Broadcast a change from inside a flush; it reaches listeners only if the transaction commits.
+
+    With ``local`` the handlers also run in this process right after commit,
+    without waiting for the notification to come back.
+    """
+    pending = session.info.setdefault('glam_changes', {})
+    if (entity, entity_id) in pending:
+        return
+    message = {"entity": entity, "id": entity_id, **data}
+    pending[(entity, entity_id)] = message if local else None
+
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": current_app.config['CHANGE_NOTIFY_CHANNEL'], "payload": json.dumps(message, default=str)}
+        )
+
+
+def _changed_rows(session):
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in list(session.new) + dirty + list(session.deleted):
+        entity = TRACKED_MODELS.get(type(obj))
+        if entity:
+            yield entity, inspect(obj).mapper.primary_key_from_instance(obj)[0]
+
+
+def _after_flush(session, flush_context):
+    for entity, entity_id in set(_changed_rows(session)):
+        publish(session, entity, entity_id)
+
+
+def _after_commit(session):
+    for message in session.info.pop('glam_changes', {}).values():
+        if message is not None:
+            dispatch(message)
+
+
+def _after_rollback(session):
+    session.info.pop('glam_changes', None)
+
+
+def listening():
+    """Whether this process's listener is connected, so changes made by other workers reach it."""
+    return _listening_pid == os.getpid()
+
+
+def _notifications(conn, timeout):
+    """Yield ``(channel, payload)`` pairs received within ``timeout`` seconds."""
+    if hasattr(conn, 'poll'):
+        # psycopg2 (a keep-alive query may already have collected some)
+        if conn.notifies or select.select([conn], [], [], timeout) != ([], [], []):
+            conn.poll()
+            while conn.notifies:
+                notice = conn.notifies.pop(0)
+                yield notice.channel, notice.payload
+    else:
+        # psycopg 3
+        for notice in conn.notifies(timeout=timeout):
+            yield notice.channel, notice.payload
+
+
+def listen(app, stop_event=None):
+    """Listener loop: dispatch notifications until ``stop_event`` is set, reconnecting on errors."""
+    global _listening_pid
+    channel = app.config['CHANGE_NOTIFY_CHANNEL']
+    delay = 1
+    while not (stop_event and stop_event.is_set()):
+        raw = None
+        try:
+            with app.app_context():
+                raw = db.engine.raw_connection()
+            # A dedicated connection for the lifetime of the loop, outside the pool.
+            # detach() forgets the driver connection, so take it first.
+            conn = raw.driver_connection
+            raw.detach()
+            conn.autocommit = True
+            conn.cursor().execute(f'LISTEN "{channel}"')
+            # Anything may have changed while we were not listening
+            dispatch_all()
+            _listening_pid = os.getpid()
+            delay = 1
+
+            while not (stop_event and stop_event.is_set()):
+                idle = True
+                for _, payload in _notifications(conn, timeout=5):
+                    idle = False
+                    dispatch(json.loads(payload))
+                if idle:
+                    # A dropped connection doesn't always wake select(); find out within seconds
+                    conn.cursor().execute("SELECT 1")
+        except Exception:
+            _listening_pid = None
+            logger.exception("Change listener lost its connection; retrying in %ss", delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+        finally:
+            _listening_pid = None
+            if raw is not None:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+
+
+def start_listener(app):
+    """Start this process's listener thread once (again after a fork)."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        threading.Thread(target=listen, args=(app,), name="change-listener", daemon=True).start()
+
+
+def init_app(app):
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+
+    if app.config['CHANGE_NOTIFY_LISTEN'] and app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        @app.before_request
+        def ensure_change_listener():
+            start_listener(app)
+
+
+# Local cache evictions
+
+@on_change('product')
+def evict_product(message):
+    product_id = message['id']
+    if product_id is None:
+        catalog_cache.delete_namespace('product')
+    else:
+        catalog_cache.delete(('product', product_id))
+    catalog_cache.delete_namespace('storefront')
+
+
+@on_change('category')
+def evict_category(message):
+    # Cached products embed the category name
+    catalog_cache.delete_namespace('product')
+    catalog_cache.delete_namespace('storefront')
+
+
+@on_change('supplier')
+def evict_supplier(message):
+    supplier_id = message['id']
+    if supplier_id is None:
+        catalog_cache.delete_namespace('supplier')
+    else:
+        catalog_cache.delete(('supplier', supplier_id))
+    # Cached products embed the supplier name
+    catalog_cache.delete_namespace('product')
+    catalog_cache.delete_namespace('storefront')
+
+
+@on_change('user')
+def evict_user(message):
+    uid = message['id']
+    if uid is None:
+        role_cache.clear()
+    else:
+        role_cache.delete(uid)
@@ -0,0 +1,140 @@
+"""Monthly range partitions for the append-heavy tables.
+
+``orders``, ``order_items`` and ``transactions`` are partitioned by month on
+``created_at`` (migration 5e8d2b7c41a9). Each month lives in a child table
+named ``<table>_pYYYY_MM``; rows outside every month land in
+``<table>_default``. ``maintain()`` creates the upcoming months and detaches
+(and optionally archives or drops) months older than the retention window.
+"""
+import re
+from datetime import date, datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from . import db
+
+PARTITIONED_TABLES = ('orders', 'order_items', 'transactions')
+
+_PARTITION_NAME = re.compile(r'_p(\d{4})_(\d{2})$')
+_CHILD_TABLE = re.compile('^(' + '|'.join(PARTITIONED_TABLES) + r')_(p\d{4}_\d{2}|default)$')
+
+partitions_cli = AppGroup('partitions', help="Manage monthly table partitions.")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partition(name):
+    """Whether ``name`` is a monthly or default partition (attached or not) rather than a model's table."""
+    return bool(_CHILD_TABLE.match(name))
+
+
+def list_partitions(table):
+    """Return ``{month: partition_name}`` for the monthly partitions attached to ``table``."""
+    rows = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": table}).scalars()
+
+    partitions = {}
+    for name in rows:
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(table, month):
+    """Create and attach the partition for ``month``, moving any matching rows out of the default partition."""
+    name = partition_name(table, month)
+    lower, upper = month, add_months(month, 1)
+    bounds = {"lower": datetime.combine(lower, datetime.min.time()),
+              "upper": datetime.combine(upper, datetime.min.time())}
+
+    db.session.execute(text(
+        f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    db.session.execute(text(
+        f"WITH moved AS ("
+        f" DELETE FROM {table}_default WHERE created_at >= :lower AND created_at < :upper RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    db.session.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+    return name
+
+
+def retire_partition(table, name, archive_schema=None, drop=False):
+    """Detach a partition and either move it to ``archive_schema`` or drop it."""
+    db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if drop:
+        db.session.execute(text(f"DROP TABLE {name}"))
+    elif archive_schema:
+        db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+        db.session.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+
+
+def maintain(months_ahead=3, retain_months=None, archive_schema=None, drop=False, today=None):
+    """Create partitions for the coming months and retire those past the retention window."""
+    current = month_start(today or date.today())
+    created, retired = [], []
+
+    for table in PARTITIONED_TABLES:
+        existing = list_partitions(table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(create_partition(table, month))
+
+        if retain_months is not None:
+            cutoff = add_months(current, -retain_months)
+            for month, name in sorted(existing.items()):
+                if month < cutoff:
+                    retire_partition(table, name, archive_schema=archive_schema, drop=drop)
+                    retired.append(name)
+
+        # Commit per table so a failure on one table doesn't undo the others
+        db.session.commit()
+
+    return created, retired
+
+
+@partitions_cli.command("maintain")
+@click.option("--months-ahead", type=int, default=3, help="Months of future partitions to keep ready.")
+@click.option("--retain-months", type=int, default=None, help="Detach partitions older than this many months.")
+@click.option("--archive-schema", default=None, help="Schema to move detached partitions into.")
+@click.option("--drop", is_flag=True, help="Drop detached partitions instead of keeping them.")
+def maintain_command(months_ahead, retain_months, archive_schema, drop):
+    """Create upcoming partitions and detach old ones."""
+    created, retired = maintain(months_ahead, retain_months, archive_schema, drop)
+    for name in created:
+        print(f"Created partition {name}")
+    for name in retired:
+        print(f"Retired partition {name}")
+    if not created and not retired:
+        print("Partitions are up to date.")
+
+
+@partitions_cli.command("list")
+def list_command():
+    """List the monthly partitions of each partitioned table."""
+    for table in PARTITIONED_TABLES:
+        months = sorted(list_partitions(table))
+        span = f"{months[0]:%Y-%m} .. {months[-1]:%Y-%m}" if months else "none"
+        print(f"{table}: {len(months)} partitions ({span})")
@@ -0,0 +1,65 @@
+"""Password reset tokens and delivery.
+
+Reset tokens are signed with itsdangerous under their own salt, not issued
+as JWTs, so no ``@jwt_required`` route accepts them. Each token embeds a
+fragment of the user's current password hash, so it stops working once the
+password has been changed. That makes it single-use.
+
+Links are emailed over SMTP when ``MAIL_SERVER`` is set. Otherwise the
+request is only logged, without the link.
+"""
+import smtplib
+from email.message import EmailMessage
+
+from flask import current_app
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+SALT = 'glam-password-reset'
+
+
+def _serializer():
+    config = current_app.config
+    return URLSafeTimedSerializer(config['PASSWORD_RESET_SECRET'] or config['JWT_SECRET_KEY'], salt=SALT)
+
+
+def _fingerprint(user):
+    return user.password_hash[-16:]
+
+
+def make_token(user):
+    return _serializer().dumps({"uid": user.uid, "pw": _fingerprint(user)})
+
+
+def user_for_token(token, load_user):
+    """The user a still-valid token was issued to, or None."""
+    try:
+        data = _serializer().loads(token, max_age=current_app.config['PASSWORD_RESET_MAX_AGE'])
+    except (SignatureExpired, BadSignature):
+        return None
+    user = load_user(data.get("uid"))
+    if user is None or data.get("pw") != _fingerprint(user):
+        return None
+    return user
+
+
+def send_reset_link(user, reset_url):
+    config = current_app.config
+    if not config['MAIL_SERVER']:
+        current_app.logger.warning("Password reset requested for user %s, but MAIL_SERVER is not set", user.uid)
+        return
+
+    message = EmailMessage()
+    message['Subject'] = "Reset your Glam password"
+    message['From'] = config['MAIL_FROM']
+    message['To'] = user.email
+    message.set_content(
+        f"Hi {user.name},\n\nUse this link within the hour to choose a new password:\n{reset_url}\n\n"
+        "If you didn't ask for this, you can ignore this email."
+    )
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT']) as smtp:
+        if config['MAIL_USE_TLS']:
+            smtp.starttls()
+        if config['MAIL_USERNAME']:
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        smtp.send_message(message)
+    current_app.logger.info("Password reset email sent to user %s", user.uid)
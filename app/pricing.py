@@ -0,0 +1,171 @@
+"""Server-side pricing for carts and orders.
+
+``price_cart`` takes cart lines (product id and quantity), loads every
+price it doesn't already know with one query, and returns line totals,
+discount, tax and grand total computed with ``Decimal``. Prices are
+memoized per catalog version: any product change (on any worker, via
+app/notify.py) starts a new version and drops the memo. The memo is also
+dropped every ``CATALOG_CACHE_TTL`` seconds, so a worker that misses
+notifications (listener disabled or reconnecting) can't quote stale prices
+for longer than that.
+
+``compute_quote`` is the pure arithmetic part and does no I/O.
+"""
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import any_, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from . import db
+from .model import Product
+from .notify import on_change
+
+CENT = Decimal('0.01')
+
+
+class PricingError(Exception):
+    """A cart that can't be priced; ``details`` is returned to the client."""
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+
+class PriceList:
+    """Memoized ``{product_id: unit price}`` for the current catalog version."""
+
+    def __init__(self):
+        self.version = 0
+        self._prices = {}
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        self.version += 1
+        self._prices = {}
+        self._started_at = time.monotonic()
+
+    def get_many(self, product_ids, ttl=None):
+        with self._lock:
+            if ttl is not None and time.monotonic() - self._started_at > ttl:
+                self._invalidate()
+            version, prices = self.version, self._prices
+        found = {pid: prices[pid] for pid in product_ids if pid in prices}
+
+        misses = [pid for pid in product_ids if pid not in found]
+        if misses:
+            rows = db.session.execute(
+                select(Product.id, Product.price)
+                .where(Product.id == any_(db.bindparam('ids', misses, type_=ARRAY(db.Integer))))
+                .where(Product.status == 'active')
+            ).all()
+            loaded = {row.id: Decimal(row.price) for row in rows}
+            with self._lock:
+                # Don't memoize prices read under a version that has since been replaced
+                if self.version == version:
+                    self._prices.update(loaded)
+            found.update(loaded)
+        return found
+
+
+price_list = PriceList()
+
+
+@on_change('product')
+def invalidate_prices(message):
+    price_list.invalidate()
+
+
+def normalize_lines(lines):
+    """Validate ``[{"product_id": .., "quantity": ..}]`` and merge repeated products, keeping order."""
+    if not isinstance(lines, list) or not lines:
+        raise PricingError("Cart is empty")
+    if len(lines) > current_app.config['PRICING_MAX_LINES']:
+        raise PricingError(f"A cart can have at most {current_app.config['PRICING_MAX_LINES']} lines")
+
+    merged = {}
+    for line in lines:
+        try:
+            product_id = int(line['product_id'])
+            quantity = int(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise PricingError("Each line needs an integer product_id and quantity")
+        if quantity <= 0:
+            raise PricingError("Quantities must be positive", product_id=product_id)
+        merged[product_id] = merged.get(product_id, 0) + quantity
+    return list(merged.items())
+
+
+def discount_rate(subtotal, tiers):
+    """The best rate among ``(threshold, rate)`` tiers the subtotal reaches."""
+    return max((Decimal(rate) for threshold, rate in tiers if subtotal >= Decimal(threshold)), default=Decimal(0))
+
+
+def compute_quote(lines, prices, tiers=(), tax_rate=Decimal(0)):
+    """Price ``[(product_id, quantity)]`` against ``{product_id: unit price}``."""
+    quoted = []
+    subtotal = Decimal(0)
+    for product_id, quantity in lines:
+        unit_price = prices[product_id]
+        line_total = unit_price * quantity
+        subtotal += line_total
+        quoted.append((product_id, quantity, unit_price, line_total))
+
+    discount = (subtotal * discount_rate(subtotal, tiers)).quantize(CENT, ROUND_HALF_UP)
+    tax = ((subtotal - discount) * Decimal(tax_rate)).quantize(CENT, ROUND_HALF_UP)
+    return {
+        "lines": quoted,
+        "subtotal": subtotal,
+        "discount": discount,
+        "tax": tax,
+        "total": subtotal - discount + tax
+    }
+
+
+def price_cart(lines):
+    """Normalize and price cart lines with one query for any prices not already memoized."""
+    lines = normalize_lines(lines)
+    prices = price_list.get_many([product_id for product_id, _ in lines], ttl=current_app.config['CATALOG_CACHE_TTL'])
+    unavailable = [product_id for product_id, _ in lines if product_id not in prices]
+    if unavailable:
+        raise PricingError("Some products are unavailable", unavailable=unavailable)
+
+    return compute_quote(
+        lines, prices,
+        tiers=current_app.config['PRICING_DISCOUNT_TIERS'],
+        tax_rate=current_app.config['PRICING_TAX_RATE']
+    )
+
+
+def quote_to_dict(quote):
+    return {
+        "lines": [
+            {
+                "product_id": product_id,
+                "quantity": quantity,
+                "unit_price": float(unit_price),
+                "line_total": float(line_total)
+            }
+            for product_id, quantity, unit_price, line_total in quote["lines"]
+        ],
+        "subtotal": float(quote["subtotal"]),
+        "discount": float(quote["discount"]),
+        "tax": float(quote["tax"]),
+        "total": float(quote["total"])
+    }
+
+
+def matches_total(quote, client_total):
+    """Whether a client-supplied total agrees with the quote to the cent."""
+    try:
+        return Decimal(str(client_total)).quantize(CENT, ROUND_HALF_UP) == quote["total"].quantize(CENT)
+    except (InvalidOperation, TypeError, ValueError):
+        return False
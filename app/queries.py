@@ -0,0 +1,65 @@
+"""Hot-path lookups as 2.0-style cached statements.
+
+The legacy ``Model.query`` API builds a new ``Query`` object and works out
+its cache key on every call. The statements here are ``lambda_stmt``s, so
+their construction is skipped entirely after the first call and SQLAlchemy
+reuses the compiled SQL; only the bound values change per request.
+Primary-key lookups go through ``Session.get``, which checks the identity
+map first and otherwise runs the mapper's cached load statement.
+"""
+from flask import abort
+from sqlalchemy import any_, lambda_stmt, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from . import db
+from .cache import role_cache
+from .model import User
+
+
+def get_or_none(model, ident, options=()):
+    """Load a row by primary key, or return None."""
+    if ident is None:
+        return None
+    return db.session.get(model, ident, options=options)
+
+
+def get_or_404(model, ident, options=()):
+    """Load a row by primary key, or abort with 404."""
+    row = get_or_none(model, ident, options)
+    if row is None:
+        abort(404)
+    return row
+
+
+def user_by_email_stmt(email):
+    return lambda_stmt(lambda: select(User).where(User.email == email))
+
+
+def user_by_email(email):
+    """Used by login and password reset."""
+    return db.session.execute(user_by_email_stmt(email)).scalar_one_or_none()
+
+
+def by_ids(model, pk, ids, options=()):
+    """All rows whose ``pk`` is in ``ids``, in one ``WHERE pk = ANY(:ids)`` query."""
+    stmt = (
+        select(model)
+        .where(pk == any_(db.bindparam('ids', ids, type_=ARRAY(db.Integer))))
+        .options(*options)
+    )
+    return db.session.execute(stmt).unique().scalars().all()
+
+
+def is_admin(uid):
+    """Whether ``uid`` is an admin, answered from the role cache when possible."""
+    if uid is None:
+        return False
+    admin = role_cache.get(uid)
+    if admin is None:
+        admin = db.session.execute(
+            lambda_stmt(lambda: select(User.is_admin).where(User.uid == uid))
+        ).scalar_one_or_none()
+        if admin is None:
+            return False
+        role_cache.set(uid, admin)
+    return admin
@@ -0,0 +1,125 @@
+""""Frequently bought together" recommendations.
+
+``product_pairs`` is a sparse product x product co-occurrence matrix: one
+row per ordered pair of products that have appeared in the same order,
+counting how many orders contained both. ``build()`` updates it
+incrementally from the ``order_items`` created since its last run (the
+``job_watermarks`` row ``product_pairs``). An order that gains items later
+only adds the pairs that involve the new products, so no order is counted
+twice.
+
+Only products whose counts changed get their top-K neighbours re-ranked
+into ``product_recommendations``. That table is keyed by
+``(product_id, rank)``, so the endpoint reads one product's list with a
+single index range scan.
+
+Deleted orders are not subtracted. Run ``flask recommendations build --full``
+now and then to recount from scratch.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from . import db
+
+WATERMARK = 'product_pairs'
+
+# Items newer than this are left for the next run, so rows written by
+# transactions that were still open when a run started aren't skipped
+SETTLE_DELAY = timedelta(minutes=5)
+
+EPOCH = datetime(1970, 1, 1)
+
+recommendations_cli = AppGroup('recommendations', help="Product recommendations.")
+
+# Pairs of distinct products per order, among the orders that got items in
+# (since, until], minus the pairs those orders already had at ``since``
+_COUNT_NEW_PAIRS = text("""
+WITH touched AS (
+    SELECT DISTINCT order_id FROM order_items
+    WHERE created_at > :since AND created_at <= :until
+),
+after AS (
+    SELECT DISTINCT oi.order_id, oi.product_id
+    FROM order_items oi JOIN touched t ON t.order_id = oi.order_id
+    WHERE oi.created_at <= :until
+),
+before AS (
+    SELECT DISTINCT oi.order_id, oi.product_id
+    FROM order_items oi JOIN touched t ON t.order_id = oi.order_id
+    WHERE oi.created_at <= :since
+),
+new_pairs AS (
+    SELECT a.order_id, a.product_id, b.product_id AS related_id
+    FROM after a JOIN after b ON b.order_id = a.order_id AND b.product_id <> a.product_id
+    EXCEPT
+    SELECT a.order_id, a.product_id, b.product_id
+    FROM before a JOIN before b ON b.order_id = a.order_id AND b.product_id <> a.product_id
+)
+INSERT INTO product_pairs (product_id, related_id, orders)
+SELECT product_id, related_id, count(*) FROM new_pairs GROUP BY product_id, related_id
+ON CONFLICT (product_id, related_id) DO UPDATE SET orders = product_pairs.orders + excluded.orders
+RETURNING product_id
+""")
+
+_RANK = text("""
+INSERT INTO product_recommendations (product_id, rank, related_id, orders)
+SELECT product_id, rank, related_id, orders FROM (
+    SELECT product_id, related_id, orders,
+           row_number() OVER (PARTITION BY product_id ORDER BY orders DESC, related_id) AS rank
+    FROM product_pairs
+    WHERE product_id = ANY(:ids) AND orders >= :min_orders
+) ranked
+WHERE rank <= :top_k
+""")
+
+
+def _lock_watermark():
+    """Return the watermark, holding its row lock so concurrent runs wait instead of double counting."""
+    db.session.execute(text(
+        "INSERT INTO job_watermarks (name, value) VALUES (:name, :epoch) ON CONFLICT (name) DO NOTHING"
+    ), {"name": WATERMARK, "epoch": EPOCH})
+    return db.session.execute(text(
+        "SELECT value FROM job_watermarks WHERE name = :name FOR UPDATE"
+    ), {"name": WATERMARK}).scalar_one()
+
+
+def build(full=False, now=None):
+    """Fold new order items into ``product_pairs`` and re-rank affected products.
+
+    Returns the number of products whose recommendations were rebuilt.
+    """
+    config = current_app.config
+    since = _lock_watermark()
+    if full:
+        db.session.execute(text("TRUNCATE product_pairs, product_recommendations"))
+        since = EPOCH
+    until = (now or datetime.utcnow()) - SETTLE_DELAY
+    if until <= since:
+        db.session.rollback()
+        return 0
+
+    changed = sorted(set(db.session.execute(_COUNT_NEW_PAIRS, {"since": since, "until": until}).scalars()))
+    if changed:
+        db.session.execute(text("DELETE FROM product_recommendations WHERE product_id = ANY(:ids)"), {"ids": changed})
+        db.session.execute(_RANK, {
+            "ids": changed,
+            "min_orders": config['RECOMMENDATIONS_MIN_ORDERS'],
+            "top_k": config['RECOMMENDATIONS_TOP_K']
+        })
+
+    db.session.execute(text("UPDATE job_watermarks SET value = :until WHERE name = :name"),
+                       {"until": until, "name": WATERMARK})
+    db.session.commit()
+    return len(changed)
+
+
+@recommendations_cli.command("build")
+@click.option("--full", is_flag=True, help="Recount every order instead of only new items.")
+def build_command(full):
+    """Update "frequently bought together" recommendations."""
+    rebuilt = build(full=full)
+    print(f"Recommendations rebuilt for {rebuilt} products.")
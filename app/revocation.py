@@ -0,0 +1,188 @@
+"""Access token revocation.
+
+Every token issued at login is recorded in ``auth_tokens`` by its ``jti``.
+Revoking a token (logout, role change, user deletion) sets ``revoked_at``
+and announces the ``jti`` through app/notify.py.
+
+Each worker keeps the revoked, unexpired ``jti``s in a Bloom filter, plus
+an exact set of the revocations it has heard about since it last loaded
+the filter. Most tokens are not revoked. For those the Bloom filter answers
+"no" from memory, so ``@jwt_required`` does no I/O. Only a Bloom hit
+(a revoked token, or a rare false positive) is confirmed with a primary
+key lookup. The filter is reloaded every ``REVOCATION_RELOAD_INTERVAL``
+seconds, which drops expired tokens, and whenever the change listener
+reconnects.
+
+Revocations made on other workers only reach the filter through the change
+listener. While this worker's listener isn't connected (not started yet,
+reconnecting, or ``CHANGE_NOTIFY_LISTEN`` off), every check goes to the
+table instead, so a revoked token is never accepted for want of a
+notification.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_jwt_extended import create_access_token, get_jti
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from . import db
+from .model import AuthToken
+from .notify import listening, on_change, publish
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """Per-process view of the revoked tokens."""
+
+    def __init__(self):
+        self._bloom = None
+        self._revoked = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def add(self, jti):
+        with self._lock:
+            self._revoked.add(jti)
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def reload(self):
+        """Rebuild the Bloom filter from ``auth_tokens``."""
+        config = current_app.config
+        with self._lock:
+            before = set(self._revoked)
+        jtis = db.session.execute(
+            select(AuthToken.jti)
+            .where(AuthToken.revoked_at.is_not(None), AuthToken.expires_at > datetime.utcnow())
+        ).scalars().all()
+
+        bloom = BloomFilter(max(config['REVOCATION_BLOOM_CAPACITY'], 2 * len(jtis)),
+                            config['REVOCATION_BLOOM_ERROR_RATE'])
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            # Revocations announced during the query may not be in its snapshot
+            self._revoked -= before
+            for jti in self._revoked:
+                bloom.add(jti)
+            self._bloom = bloom
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, jti):
+        if not listening():
+            return self._confirm(jti)
+
+        with self._lock:
+            loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > current_app.config['REVOCATION_RELOAD_INTERVAL']:
+            self.reload()
+
+        with self._lock:
+            if jti in self._revoked:
+                return True
+            if jti not in self._bloom:
+                return False
+        return self._confirm(jti)
+
+    def _confirm(self, jti):
+        """Look ``jti`` up in ``auth_tokens``."""
+        revoked_at = db.session.execute(
+            select(AuthToken.revoked_at).where(AuthToken.jti == jti)
+        ).scalar_one_or_none()
+        if revoked_at is None:
+            return False
+        self.add(jti)
+        return True
+
+
+revocations = RevocationList()
+
+
+@on_change('token')
+def remember_revocation(message):
+    if message['id'] is None:
+        revocations.invalidate()
+    else:
+        revocations.add(message['id'])
+
+
+def check_token(jwt_header, jwt_payload):
+    """``token_in_blocklist_loader`` callback."""
+    return revocations.is_revoked(jwt_payload['jti'])
+
+
+def issue_token(user, expires_delta):
+    """Create an access token for ``user`` and record it; the caller commits."""
+    access_token = create_access_token(identity=user.uid, expires_delta=expires_delta)
+    db.session.add(AuthToken(
+        jti=get_jti(access_token),
+        user_id=user.uid,
+        expires_at=datetime.utcnow() + expires_delta
+    ))
+    return access_token
+
+
+def revoke_token(jti, user_id, expires_at):
+    """Revoke one token, recording it first if it was issued before tokens were tracked."""
+    now = datetime.utcnow()
+    stmt = insert(AuthToken).values(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=now, created_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[AuthToken.jti], set_={"revoked_at": now}
+    ))
+    publish(db.session, 'token', jti)
+
+
+def revoke_user_tokens(user_id):
+    """Revoke every unexpired token of ``user_id``; the caller commits."""
+    now = datetime.utcnow()
+    jtis = db.session.execute(
+        update(AuthToken)
+        .where(AuthToken.user_id == user_id, AuthToken.revoked_at.is_(None), AuthToken.expires_at > now)
+        .values(revoked_at=now)
+        .returning(AuthToken.jti)
+    ).scalars().all()
+    for jti in jtis:
+        publish(db.session, 'token', jti)
+    return len(jtis)
+
+
+def expire_tokens():
+    """Delete tokens that have expired; they no longer need to be checked."""
+    # Keep a little slack for clock skew between the app servers
+    cutoff = datetime.utcnow() - timedelta(hours=1)
+    return db.session.execute(delete(AuthToken).where(AuthToken.expires_at < cutoff)).rowcount
+
+
+def init_app(jwt):
+    jwt.token_in_blocklist_loader(check_token)
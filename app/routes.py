@@ -1,9 +1,21 @@
-from flask import Blueprint, request, jsonify
-from datetime import timedelta
+from flask import Blueprint, request, jsonify, abort, make_response, current_app
+from datetime import datetime, timedelta
 from . import db, bcrypt
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from .model import User, Category, Product, Order, OrderItem, Transaction, Supplier
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from .model import User, Category, Product, Order, OrderItem, OrderStatus, Transaction, Supplier, Cart, ReorderRecommendation, ProductRecommendation
+from .jobs import enqueue
+from .cache import catalog_cache
+from .fields import parse_fields, projection, narrow
+from .queries import get_or_404, get_or_none, user_by_email, by_ids, is_admin
+from .pricing import PricingError, price_cart, quote_to_dict, matches_total, normalize_lines
+from .inventory import InsufficientStock, place_holds, release_holds, convert_holds
+from .idempotency import idempotent
+from .revocation import issue_token, revoke_token, revoke_user_tokens
+from .customers import CursorError, customers_page
+from .password_reset import user_for_token
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 import random
 import string
 
@@ -13,6 +25,77 @@ main_bp = Blueprint('main', __name__)
 def generate_uid():
     return ''.join(random.choices(string.digits, k=6))  # Random 6-digit UID
 
+# Utility function to bound a query to the ?since=/&until= period (ISO 8601).
+# Filtering on the partition key lets Postgres skip partitions outside the period;
+# upper_columns only get the `until` bound (e.g. an order's created_at, which
+# always precedes its transactions).
+def apply_period(query, column, *upper_columns):
+    bounds = {}
+    for param in ('since', 'until'):
+        value = request.args.get(param)
+        if value:
+            try:
+                bounds[param] = datetime.fromisoformat(value)
+            except ValueError:
+                abort(make_response(jsonify({"error": f"Invalid '{param}' date, expected ISO 8601"}), 400))
+
+    if 'since' in bounds:
+        query = query.filter(column >= bounds['since'])
+    if 'until' in bounds:
+        for bounded in (column,) + upper_columns:
+            query = query.filter(bounded < bounds['until'])
+    return query
+
+# Utility function to parse the ?ids=1,2,3 list of a multi-get request (duplicates dropped, order kept)
+def parse_id_list():
+    try:
+        ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        abort(make_response(jsonify({"error": "'ids' must be a comma-separated list of integers"}), 400))
+
+    ids = list(dict.fromkeys(ids))
+    limit = current_app.config['MULTI_GET_MAX_IDS']
+    if len(ids) > limit:
+        abort(make_response(jsonify({"error": f"At most {limit} ids can be requested at once"}), 400))
+    return ids
+
+# Utility function to serialize many rows by id with a single `WHERE pk = ANY(:ids)` query.
+# With a cache namespace, cached entries are served first and full (unnarrowed) misses are cached.
+def multi_get(model, pk, ids, namespace=None):
+    fields = parse_fields(model)
+    found = {}
+    if namespace:
+        hits = catalog_cache.get_many([(namespace, ident) for ident in ids])
+        found = {key[1]: narrow(value, fields) for key, value in hits.items()}
+
+    misses = [ident for ident in ids if ident not in found]
+    if misses:
+        rows = by_ids(model, pk, misses, options=projection(model, fields))
+        loaded = {getattr(row, pk.key): row.to_dict(fields) for row in rows}
+        if namespace and fields is None:
+            catalog_cache.set_many({(namespace, ident): data for ident, data in loaded.items()})
+        found.update(loaded)
+
+    return jsonify({
+        "data": [found[ident] for ident in ids if ident in found],
+        "missing": [ident for ident in ids if ident not in found]
+    })
+
+# Utility function to get the cart lines to price: the request's items, or the user's saved cart
+def cart_lines(data, user_id):
+    items = (data or {}).get('items')
+    if items is None and user_id is not None:
+        rows = db.session.execute(
+            select(Cart.product_id, Cart.quantity).where(Cart.user_id == user_id)
+        ).all()
+        items = [{"product_id": row.product_id, "quantity": row.quantity} for row in rows]
+    return items
+
+# Health check (never touches the database)
+@main_bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok"}), 200
+
 # Login route
 @main_bp.route('/login', methods=['POST'])
 def login():
@@ -20,27 +103,41 @@ def login():
     email = data.get('email')
     password = data.get('password')
 
-    user = User.query.filter_by(email=email).first()
+    user = user_by_email(email)
 
     if user and bcrypt.check_password_hash(user.password_hash, password):
-        access_token = create_access_token(identity=user.uid, expires_delta=timedelta(days=2))
+        access_token = issue_token(user, expires_delta=timedelta(days=2))
+        db.session.commit()
         return jsonify({"isAdmin": user.is_admin, "access_token": access_token, "data": user.to_dict()}), 200
     else:
         return jsonify({"message": "Invalid credentials"}), 401
 
+# Logout: revoke the token used for this request
+@main_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    token = get_jwt()
+    revoke_token(token['jti'], get_jwt_identity(), datetime.utcfromtimestamp(token['exp']))
+    db.session.commit()
+    return jsonify({"message": "Logged out"}), 200
+
 # Get all users
 @main_bp.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    if 'ids' in request.args:
+        return multi_get(User, User.uid, parse_id_list())
+    fields = parse_fields(User)
+    users = User.query.options(*projection(User, fields)).all()
+    return jsonify([user.to_dict(fields) for user in users])
 
 # Get a single user by ID
 @main_bp.route('/users/<string:uid>', methods=['GET'])
 @jwt_required()
 def get_user(uid):
-    user = User.query.get_or_404(uid)
-    return jsonify(user.to_dict())
+    fields = parse_fields(User)
+    user = get_or_404(User, uid, options=projection(User, fields))
+    return jsonify(user.to_dict(fields))
 
 # Create a new user
 @main_bp.route('/users', methods=['POST'])
@@ -70,14 +167,18 @@ def create_user():
 @main_bp.route('/users/<string:uid>', methods=['PUT'])
 @jwt_required()
 def update_user(uid):
-    user = User.query.get_or_404(uid)
+    user = get_or_404(User, uid)
     data = request.get_json()
     user.name = data.get('name', user.name)
     user.email = data.get('email', user.email)
     user.phone = data.get('phone', user.phone)
+    is_admin_before = user.is_admin
     if 'password' in data:
-        user.password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        user.password_hash = bcrypt.generate_password_hash(data['password']).decode('utf-8')
     user.is_admin = data.get('is_admin', user.is_admin)
+    # Same as change_user_role: a new role or password ends the existing sessions
+    if 'password' in data or user.is_admin != is_admin_before:
+        revoke_user_tokens(user.uid)
     db.session.commit()
     return jsonify(user.to_dict())
 
@@ -85,7 +186,8 @@ def update_user(uid):
 @main_bp.route('/users/<string:uid>', methods=['DELETE'])
 @jwt_required()
 def delete_user(uid):
-    user = User.query.get_or_404(uid)
+    user = get_or_404(User, uid)
+    revoke_user_tokens(user.uid)
     db.session.delete(user)
     db.session.commit()
     return jsonify({"message": "User deleted successfully"}), 200
@@ -94,15 +196,15 @@ def delete_user(uid):
 @main_bp.route('/admin/summary', methods=['GET'])
 @jwt_required()
 def admin_summary():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
+    if not is_admin(get_jwt_identity()):
         return jsonify({"message": "Access forbidden"}), 403
 
     total_products = Product.query.count()
     total_users = User.query.count()
-    total_orders = Order.query.count()
-    total_profits = db.session.query(db.func.sum(Transaction.amount)).scalar() or 0
+    total_orders = apply_period(Order.query, Order.created_at).count()
+    total_profits = apply_period(
+        db.session.query(db.func.sum(Transaction.amount)), Transaction.created_at
+    ).scalar() or 0
 
     summary = {
         "total_products": total_products,
@@ -112,6 +214,29 @@ def admin_summary():
     }
     return jsonify(summary), 200
 
+# Get reorder recommendations grouped by supplier (Admin only)
+@main_bp.route('/admin/reorder_recommendations', methods=['GET'])
+@jwt_required()
+def get_reorder_recommendations():
+    if not is_admin(get_jwt_identity()):
+        return jsonify({"message": "Access forbidden"}), 403
+
+    recommendations = db.session.execute(
+        select(ReorderRecommendation)
+        .options(joinedload(ReorderRecommendation.product), joinedload(ReorderRecommendation.supplier))
+        .order_by(ReorderRecommendation.supplier_id, ReorderRecommendation.days_of_cover)
+    ).scalars().all()
+
+    suppliers = {}
+    for recommendation in recommendations:
+        group = suppliers.setdefault(recommendation.supplier_id, {
+            "supplier_id": recommendation.supplier_id,
+            "supplier_name": recommendation.supplier.name,
+            "items": []
+        })
+        group["items"].append(recommendation.to_dict())
+    return jsonify(list(suppliers.values())), 200
+
 # Category routes
 @main_bp.route('/product_categories', methods=['GET'])
 # @jwt_required()
@@ -122,7 +247,7 @@ def get_product_categories():
 @main_bp.route('/product_categories/<int:category_id>', methods=['GET'])
 @jwt_required()
 def get_product_category(category_id):
-    category = Category.query.get_or_404(category_id)
+    category = get_or_404(Category, category_id)
     return jsonify(category.to_dict())
 
 @main_bp.route('/product_categories', methods=['POST'])
@@ -139,7 +264,7 @@ def create_product_category():
 @main_bp.route('/product_categories/<int:category_id>', methods=['PUT'])
 @jwt_required()
 def update_product_category(category_id):
-    category = Category.query.get_or_404(category_id)
+    category = get_or_404(Category, category_id)
     data = request.get_json()
     category.name = data.get('name', category.name)
     db.session.commit()
@@ -148,7 +273,7 @@ def update_product_category(category_id):
 @main_bp.route('/product_categories/<int:category_id>', methods=['DELETE'])
 @jwt_required()
 def delete_product_category(category_id):
-    category = Category.query.get_or_404(category_id)
+    category = get_or_404(Category, category_id)
     db.session.delete(category)
     db.session.commit()
     return jsonify({"message": "Product category deleted successfully"}), 200
@@ -157,23 +282,44 @@ def delete_product_category(category_id):
 @main_bp.route('/products', methods=['GET'])
 # @jwt_required()
 def get_products():
+    if 'ids' in request.args:
+        return multi_get(Product, Product.id, parse_id_list(), namespace='product')
+
+    fields = parse_fields(Product)
     category_id = request.args.get('category_id')
     status = request.args.get('status')
 
-    query = Product.query
+    query = Product.query.options(*projection(Product, fields))
     if category_id:
         query = query.filter_by(category_id=category_id)
     if status:
         query = query.filter_by(status=status)
 
     products = query.all()
-    return jsonify([product.to_dict() for product in products]), 200
+    return jsonify([product.to_dict(fields) for product in products]), 200
 
 @main_bp.route('/products/<int:product_id>', methods=['GET'])
 @jwt_required()
 def get_product(product_id):
-    product = Product.query.get_or_404(product_id)
-    return jsonify(product.to_dict()), 200
+    fields = parse_fields(Product)
+    product = get_or_404(Product, product_id, options=projection(Product, fields))
+    return jsonify(product.to_dict(fields)), 200
+
+
+# Products frequently bought together with this one (precomputed, see app/recommendations.py)
+@main_bp.route('/products/<int:product_id>/recommendations', methods=['GET'])
+def get_product_recommendations(product_id):
+    fields = parse_fields(Product)
+    rows = db.session.execute(
+        select(Product, ProductRecommendation.orders)
+        .join(ProductRecommendation, ProductRecommendation.related_id == Product.id)
+        .where(ProductRecommendation.product_id == product_id, Product.status == 'active')
+        .order_by(ProductRecommendation.rank)
+        .options(*projection(Product, fields))
+    ).all()
+    return jsonify([
+        {**product.to_dict(fields), "orders_together": orders} for product, orders in rows
+    ]), 200
 
 
 @main_bp.route('/products', methods=['POST'])
@@ -205,7 +351,7 @@ def create_product():
 @main_bp.route('/products/<int:product_id>', methods=['PUT'])
 # @jwt_required()
 def update_product(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = get_or_404(Product, product_id)
     data = request.get_json()
 
 
@@ -226,38 +372,141 @@ def update_product(product_id):
 @main_bp.route('/products/<int:product_id>', methods=['DELETE'])
 # @jwt_required()
 def delete_product(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = get_or_404(Product, product_id)
 
     db.session.delete(product)
     db.session.commit()
     return jsonify({"message": "Product deleted successfully"}), 200
 
 
+# Price a cart: the posted items, or the logged-in user's saved cart
+@main_bp.route('/cart/quote', methods=['POST'])
+@jwt_required(optional=True)
+def quote_cart():
+    data = request.get_json(silent=True)
+    try:
+        quote = price_cart(cart_lines(data, get_jwt_identity()))
+    except PricingError as e:
+        return jsonify({"error": e.message, **e.details}), 400
+    return jsonify(quote_to_dict(quote)), 200
+
+# Hold stock for a cart entering checkout (the posted items, or the user's saved cart).
+# Holds replace the user's previous ones and expire after RESERVATION_HOLD_SECONDS.
+@main_bp.route('/cart/reservations', methods=['POST'])
+@jwt_required()
+def reserve_cart():
+    current_user_id = get_jwt_identity()
+    try:
+        lines = normalize_lines(cart_lines(request.get_json(silent=True), current_user_id))
+    except PricingError as e:
+        return jsonify({"error": e.message, **e.details}), 400
+
+    try:
+        expires_at = place_holds(current_user_id, lines)
+    except InsufficientStock as e:
+        return jsonify({"error": "Insufficient stock", "available": e.shortages}), 409
+    db.session.commit()
+    return jsonify({
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in lines],
+        "expires_at": expires_at
+    }), 201
+
+# Give back the user's held stock (checkout abandoned)
+@main_bp.route('/cart/reservations', methods=['DELETE'])
+@jwt_required()
+def release_cart():
+    release_holds(get_jwt_identity())
+    db.session.commit()
+    return jsonify({"message": "Reservations released"}), 200
+
+# Storefront bootstrap: everything the landing page needs in one round trip
+# (categories with product counts, first page of products, the user's recent orders).
+# The public part is cached; the whole response takes at most three queries.
+@main_bp.route('/storefront/bootstrap', methods=['GET'])
+@jwt_required(optional=True)
+def storefront_bootstrap():
+    fields = parse_fields(Product)
+    page_size = request.args.get('page_size', 20, type=int)
+    page_size = max(1, min(page_size, current_app.config['STOREFRONT_MAX_PAGE_SIZE']))
+    cache_key = ('storefront', page_size, tuple(fields) if fields else None)
+
+    public = catalog_cache.get(cache_key)
+    if public is None:
+        product_count = db.func.count(Product.id)
+        categories = db.session.execute(
+            select(Category.id, Category.name, product_count.label('product_count'))
+            .outerjoin(Product, db.and_(Product.category_id == Category.id, Product.status == 'active'))
+            .group_by(Category.id, Category.name)
+            .order_by(Category.name)
+        ).all()
+
+        # Fetch one extra row to know whether there is a next page
+        products = db.session.execute(
+            select(Product)
+            .options(*projection(Product, fields))
+            .where(Product.status == 'active')
+            .order_by(Product.created_at.desc(), Product.id.desc())
+            .limit(page_size + 1)
+        ).unique().scalars().all()
+
+        public = {
+            "categories": [
+                {"id": row.id, "name": row.name, "product_count": row.product_count}
+                for row in categories
+            ],
+            "products": [product.to_dict(fields) for product in products[:page_size]],
+            "has_more_products": len(products) > page_size
+        }
+        catalog_cache.set(cache_key, public)
+
+    recent_orders = []
+    current_user_id = get_jwt_identity()
+    if current_user_id is not None:
+        orders = db.session.execute(
+            select(Order)
+            .options(joinedload(Order.user))
+            .where(Order.user_id == current_user_id)
+            .order_by(Order.created_at.desc())
+            .limit(current_app.config['STOREFRONT_RECENT_ORDERS'])
+        ).scalars().all()
+        recent_orders = [order.to_dict() for order in orders]
+
+    return jsonify({**public, "recent_orders": recent_orders}), 200
+
 # Order routes
 @main_bp.route('/orders', methods=['GET'])
 @jwt_required()
 def get_orders():
     current_user_id = get_jwt_identity()
-    orders = Order.query.filter_by(user_id=current_user_id).all()
+    orders = apply_period(Order.query.filter_by(user_id=current_user_id), Order.created_at).all()
     return jsonify([order.to_dict() for order in orders])
 
 @main_bp.route('/orders/<int:order_id>', methods=['GET'])
 @jwt_required()
 def get_order(order_id):
-    order = Order.query.get_or_404(order_id)
+    order = get_or_404(Order, order_id)
     return jsonify(order.to_dict())
 
 @main_bp.route('/orders', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_order():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     current_user_id = get_jwt_identity()
 
+    # The total is always computed server-side; a client total is only checked against it
+    try:
+        quote = price_cart(cart_lines(data, current_user_id))
+    except PricingError as e:
+        return jsonify({"error": e.message, **e.details}), 400
+    if 'total' in data and not matches_total(quote, data['total']):
+        return jsonify({"error": "Cart total has changed", "quote": quote_to_dict(quote)}), 409
+
+    # Ids come from orders_id_seq: the partitioned table can't enforce a unique id on its own
     new_order = Order(
-        id=generate_uid(),
         user_id=current_user_id,
-        total_amount=data['total'],
-        status=data.get('Status', 'Pending')
+        total_amount=quote['total'],
+        status=OrderStatus.PENDING
     )
     db.session.add(new_order)
     db.session.commit()
@@ -266,7 +515,7 @@ def create_order():
 @main_bp.route('/orders/<int:order_id>', methods=['PUT'])
 @jwt_required()
 def update_order(order_id):
-    order = Order.query.get_or_404(order_id)
+    order = get_or_404(Order, order_id)
     data = request.get_json()
     order.status = data.get('status', order.status)
     db.session.commit()
@@ -275,7 +524,7 @@ def update_order(order_id):
 @main_bp.route('/orders/<int:order_id>', methods=['DELETE'])
 @jwt_required()
 def delete_order(order_id):
-    order = Order.query.get_or_404(order_id)
+    order = get_or_404(Order, order_id)
     db.session.delete(order)
     db.session.commit()
     return jsonify({"message": "Order deleted successfully"}), 200
@@ -285,28 +534,35 @@ def delete_order(order_id):
 @jwt_required()
 def get_order_items():
     current_user_id = get_jwt_identity()
-    items = OrderItem.query.filter_by(user_id=current_user_id).all()
+    items = apply_period(OrderItem.query.filter_by(user_id=current_user_id), OrderItem.created_at).all()
     return jsonify([item.to_dict() for item in items])
 
 @main_bp.route('/order_items/<int:item_id>', methods=['GET'])
 @jwt_required()
 def get_order_item(item_id):
-    item = OrderItem.query.get_or_404(item_id)
+    item = get_or_404(OrderItem, item_id)
     return jsonify(item.to_dict())
 
 @main_bp.route('/order_items', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_order_item():
     data = request.get_json()
     current_user_id = get_jwt_identity()
 
+    # Unit price comes from the catalog, not the client
+    try:
+        quote = price_cart([{"product_id": data.get('product_id'), "quantity": data.get('quantity')}])
+    except PricingError as e:
+        return jsonify({"error": e.message, **e.details}), 400
+    product_id, quantity, unit_price, _ = quote['lines'][0]
+
     new_item = OrderItem(
-        id=generate_uid(),
         user_id=current_user_id,
         order_id=data['order_id'],
-        product_id=data['product_id'],
-        quantity=data['quantity'],
-        price=data['price']
+        product_id=product_id,
+        quantity=quantity,
+        price=unit_price
     )
     db.session.add(new_item)
     db.session.commit()
@@ -315,7 +571,7 @@ def create_order_item():
 @main_bp.route('/order_items/<int:item_id>', methods=['DELETE'])
 @jwt_required()
 def delete_order_item(item_id):
-    item = OrderItem.query.get_or_404(item_id)
+    item = get_or_404(OrderItem, item_id)
     db.session.delete(item)
     db.session.commit()
     return jsonify({"message": "Order item deleted successfully"}), 200
@@ -325,32 +581,35 @@ def delete_order_item(item_id):
 def get_transactions():
     current_user_id = get_jwt_identity()
 
-    transactions = Transaction.query.filter_by(user_id=current_user_id).all()
+    transactions = apply_period(
+        Transaction.query.filter_by(user_id=current_user_id), Transaction.created_at
+    ).all()
 
     return jsonify([txn.to_dict() for txn in transactions])
 
 @main_bp.route('/transactions/<int:txn_id>', methods=['GET'])
 # @jwt_required()
 def get_transaction(txn_id):
-    transaction = Transaction.query.get_or_404(txn_id)
+    transaction = get_or_404(Transaction, txn_id)
     return jsonify(transaction.to_dict())
 
 @main_bp.route('/transactions/<int:txn_id>', methods=['PUT'])
 # @jwt_required()
 def update_transaction(txn_id):
     # Fetch the transaction
-    transaction = Transaction.query.get_or_404(txn_id)
+    transaction = get_or_404(Transaction, txn_id)
     data = request.get_json()
 
     # Update transaction fields
     # transaction.amount = data.get('amount', transaction.amount)
+    was_paid = transaction.payment_status == 'Paid'
     transaction.payment_status = data.get('payment_status', transaction.payment_status)
 
-    # Check if payment_status is updated to "Paid" and update the related order
-    if transaction.payment_status == 'Paid':
-        order = Order.query.get(transaction.order_id)
-        if order:
-            order.status = 'Shipped'  # or "Delivered," depending on your business logic
+    # Only when the payment has just become "Paid" (not on repeated PUTs): ship the related order in
+    # the background, and turn the buyer's holds into sales (stock_quantity is adjusted by the sweeper).
+    if transaction.payment_status == 'Paid' and not was_paid:
+        convert_holds(transaction.user_id, transaction.order_id)
+        enqueue('mark_order_shipped', order_id=transaction.order_id)
 
     db.session.commit()
 
@@ -359,6 +618,7 @@ def update_transaction(txn_id):
 
 @main_bp.route('/transactions', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_transaction():
     data = request.get_json()
     current_user = get_jwt_identity()
@@ -368,13 +628,12 @@ def create_transaction():
         return jsonify({"message": "Missing required fields"}), 400
 
     # Check if the order exists
-    order = Order.query.get(data['order_id'])
+    order = get_or_none(Order, data['order_id'])
     if not order:
         return jsonify({"message": "Order not found"}), 404
 
     # Create a new transaction
     new_transaction = Transaction(
-        id=generate_uid(),
         user_id=current_user,
         order_id=data['order_id'],
         name=data['full_name'], 
@@ -398,19 +657,41 @@ def create_transaction():
 def request_password_reset():
     data = request.get_json()
     email = data.get('email')
-    user = User.query.filter_by(email=email).first()
+    user = user_by_email(email)
     if user:
-        # Logic to send a password reset email
+        enqueue('send_password_reset_email', uid=user.uid)
+        db.session.commit()
         return jsonify({"message": "Password reset instructions sent"}), 200
     return jsonify({"message": "User not found"}), 404
 
+# Set a new password with the token from a reset link
+@main_bp.route('/users/reset_password/confirm', methods=['POST'])
+def confirm_password_reset():
+    data = request.get_json() or {}
+    if not data.get('token') or not data.get('password'):
+        return jsonify({"error": "Missing token or password"}), 400
+
+    user = user_for_token(data['token'], lambda uid: get_or_none(User, uid))
+    if user is None:
+        return jsonify({"error": "Invalid or expired reset link"}), 400
+
+    user.password_hash = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+    # Sessions opened with the old password end here
+    revoke_user_tokens(user.uid)
+    db.session.commit()
+    return jsonify({"message": "Password updated"}), 200
+
 # Change user role
 @main_bp.route('/users/<string:uid>/role', methods=['PUT'])
 @jwt_required()
 def change_user_role(uid):
-    user = User.query.get_or_404(uid)
+    user = get_or_404(User, uid)
     data = request.get_json()
+    is_admin_before = user.is_admin
     user.is_admin = data.get('is_admin', user.is_admin)
+    # Tokens issued under the old role must log in again
+    if user.is_admin != is_admin_before:
+        revoke_user_tokens(user.uid)
     db.session.commit()
     return jsonify(user.to_dict())
 
@@ -418,7 +699,7 @@ def change_user_role(uid):
 @main_bp.route('/users/<string:uid>/orders', methods=['GET'])
 @jwt_required()
 def get_user_orders(uid):
-    orders = Order.query.filter_by(user_id=uid).all()
+    orders = apply_period(Order.query.filter_by(user_id=uid), Order.created_at).all()
     return jsonify([order.to_dict() for order in orders])
 
 
@@ -426,19 +707,50 @@ def get_user_orders(uid):
 @main_bp.route('/admin/orders', methods=['GET'])
 @jwt_required()
 def get_all_orders_admin():
-    current_user = get_jwt_identity()
-    user = User.query.get_or_404(current_user)
-    if not user.is_admin:
+    if not is_admin(get_jwt_identity()):
         return jsonify({"message": "Unauthorized"}), 403
-    orders = Order.query.all()
+    orders = apply_period(Order.query, Order.created_at).all()
     return jsonify([order.to_dict() for order in orders])
 
 
+# Customers with order count, total spent, last order date and payment status breakdown (Admin only).
+# ?sort=uid|name|order_count|total_spent|last_order_at&order=asc|desc&limit=..&cursor=..
+@main_bp.route('/admin/customers', methods=['GET'])
+@jwt_required()
+def get_customers_admin():
+    if not is_admin(get_jwt_identity()):
+        return jsonify({"message": "Unauthorized"}), 403
+
+    sort = request.args.get('sort', 'uid')
+    if sort not in ('uid', 'name', 'order_count', 'total_spent', 'last_order_at'):
+        return jsonify({"error": f"Can't sort by '{sort}'"}), 400
+    descending = request.args.get('order', 'asc' if sort in ('uid', 'name') else 'desc') == 'desc'
+    limit = min(request.args.get('limit', current_app.config['CUSTOMERS_PAGE_SIZE'], type=int),
+                current_app.config['CUSTOMERS_MAX_PAGE_SIZE'])
+    if limit <= 0:
+        return jsonify({"error": "'limit' must be positive"}), 400
+    fields = parse_fields(User)
+
+    try:
+        rows, next_cursor = customers_page(sort, descending, limit, request.args.get('cursor'),
+                                           options=projection(User, fields))
+    except CursorError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "data": [{**user.to_dict(fields), **stats} for user, stats in rows],
+        "next_cursor": next_cursor
+    }), 200
+
+
 # Get all transactions for a specific user
 @main_bp.route('/users/<string:uid>/transactions', methods=['GET'])
 @jwt_required()
 def get_user_transactions(uid):
-    transactions = Transaction.query.join(Order).filter(Order.user_id == uid).all()
+    # Both sides are partitioned; bounding both lets each scan skip partitions
+    transactions = apply_period(
+        Transaction.query.join(Transaction.order).filter(Order.user_id == uid),
+        Transaction.created_at, Order.created_at
+    ).all()
     return jsonify([transaction.to_dict() for transaction in transactions])
 
 # Get all transactions for a specific order
@@ -452,15 +764,19 @@ def get_order_transactions(order_id):
 @main_bp.route('/suppliers', methods=['GET'])
 @jwt_required()  # Optional: If you need JWT authentication
 def get_suppliers():
-    suppliers = Supplier.query.all()  # Get all suppliers
-    return jsonify([supplier.to_dict() for supplier in suppliers])
+    if 'ids' in request.args:
+        return multi_get(Supplier, Supplier.id, parse_id_list(), namespace='supplier')
+    fields = parse_fields(Supplier)
+    suppliers = Supplier.query.options(*projection(Supplier, fields)).all()  # Get all suppliers
+    return jsonify([supplier.to_dict(fields) for supplier in suppliers])
 
 # Get a single supplier by ID
 @main_bp.route('/suppliers/<int:supplier_id>', methods=['GET'])
 @jwt_required()
 def get_supplier(supplier_id):
-    supplier = Supplier.query.get_or_404(supplier_id)  # Get supplier or 404 if not found
-    return jsonify(supplier.to_dict())
+    fields = parse_fields(Supplier)
+    supplier = get_or_404(Supplier, supplier_id, options=projection(Supplier, fields))  # Get supplier or 404 if not found
+    return jsonify(supplier.to_dict(fields))
 
 # Create a new supplier
 @main_bp.route('/suppliers', methods=['POST'])
@@ -481,7 +797,7 @@ def create_supplier():
 @main_bp.route('/suppliers/<int:supplier_id>', methods=['PUT'])
 # @jwt_required()
 def update_supplier(supplier_id):
-    supplier = Supplier.query.get_or_404(supplier_id)  # Get supplier or 404 if not found
+    supplier = get_or_404(Supplier, supplier_id)  # Get supplier or 404 if not found
     data = request.get_json()  # Get the data from the request body
     supplier.name = data.get('name', supplier.name)
     supplier.contact_info = data.get('contact_info', supplier.contact_info)
@@ -493,7 +809,7 @@ def update_supplier(supplier_id):
 @main_bp.route('/suppliers/<int:supplier_id>', methods=['DELETE'])
 @jwt_required()
 def delete_supplier(supplier_id):
-    supplier = Supplier.query.get_or_404(supplier_id)  # Get supplier or 404 if not found
+    supplier = get_or_404(Supplier, supplier_id)  # Get supplier or 404 if not found
     db.session.delete(supplier)  # Delete the supplier
     db.session.commit()  # Commit the changes
     return jsonify({"message": "Supplier deleted successfully"}), 200
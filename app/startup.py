@@ -0,0 +1,55 @@
+"""Worker start-up hooks.
+
+``create_app`` never touches the database; schema changes go through
+Alembic (``flask db upgrade``). After a server forks its workers, each
+one may call ``warm_up`` to open its pool connections and run the hot
+statements once, so the first real requests don't pay for connecting
+and compiling SQL.
+"""
+from sqlalchemy import select, text
+
+from . import db
+from .model import User, Category, Product, Order, Transaction
+from .queries import user_by_email_stmt
+from .revocation import revocations
+
+
+def warm_statements():
+    """Representative hot-path statements; none of them match any rows."""
+    return [
+        user_by_email_stmt(''),
+        select(User).where(User.uid == 0).limit(0),
+        select(Category).limit(0),
+        select(Product).limit(0),
+        select(Order).where(Order.user_id == 0).limit(0),
+        select(Transaction).where(Transaction.user_id == 0).limit(0),
+    ]
+
+
+def warm_up(app, connections=None):
+    """Open pool connections and prime the compiled statement cache for this process."""
+    connections = app.config['POOL_WARM_CONNECTIONS'] if connections is None else connections
+    if connections <= 0:
+        return
+
+    with app.app_context():
+        engine = db.engine
+        # Connections inherited from the parent process must not be reused after fork
+        engine.dispose(close=False)
+
+        opened = []
+        try:
+            for _ in range(connections):
+                conn = engine.connect()
+                conn.execute(text("SELECT 1"))
+                opened.append(conn)
+            for stmt in warm_statements():
+                opened[0].execute(stmt)
+        finally:
+            for conn in opened:
+                conn.close()
+        # Load the revoked-token filter now rather than on the first authenticated request
+        revocations.reload()
+        db.session.remove()
+
+    app.logger.info("Warmed %d database connections", len(opened))
@@ -0,0 +1,75 @@
+"""Background job handlers run by ``flask worker`` (see app/jobs.py)."""
+from flask import current_app
+
+from . import db
+from .jobs import job
+from . import partitions
+from .events import prune_order_events as prune_events
+from .forecasting import run_replenishment
+from . import recommendations
+from .idempotency import expire_keys
+from .revocation import expire_tokens
+from . import inventory
+from .password_reset import make_token, send_reset_link
+from .model import User, Order, OrderStatus
+
+
+# Mark an order as shipped once its payment has gone through
+@job('mark_order_shipped')
+def mark_order_shipped(order_id):
+    order = db.session.get(Order, order_id)
+    if order and order.status == OrderStatus.PENDING:
+        order.status = OrderStatus.SHIPPED
+
+
+# Send password reset instructions
+@job('send_password_reset_email')
+def send_password_reset_email(uid):
+    user = db.session.get(User, uid)
+    if not user:
+        return
+
+    reset_url = f"{current_app.config['PASSWORD_RESET_URL']}?token={make_token(user)}"
+    send_reset_link(user, reset_url)
+
+
+# Keep monthly partitions of orders, order_items and transactions ready
+@job('maintain_partitions')
+def maintain_partitions(months_ahead=3, retain_months=None, archive_schema=None):
+    partitions.maintain(months_ahead, retain_months, archive_schema)
+
+
+# Drop streamed order events that no reconnecting client will ask for
+@job('prune_order_events')
+def prune_order_events(days=None):
+    prune_events(days or current_app.config['ORDER_EVENTS_RETENTION_DAYS'])
+
+
+# Recompute low-stock reorder recommendations
+@job('forecast_replenishment')
+def forecast_replenishment():
+    run_replenishment()
+
+
+# Fold new order items into the "frequently bought together" recommendations
+@job('build_recommendations')
+def build_recommendations(full=False):
+    recommendations.build(full=full)
+
+
+# Delete Idempotency-Key records past their TTL
+@job('expire_idempotency_keys')
+def expire_idempotency_keys():
+    expire_keys()
+
+
+# Forget access tokens that have expired anyway
+@job('expire_auth_tokens')
+def expire_auth_tokens():
+    expire_tokens()
+
+
+# Release expired stock holds and take paid ones off stock_quantity
+@job('sweep_reservations')
+def sweep_reservations():
+    inventory.sweep()
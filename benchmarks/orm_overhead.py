@@ -0,0 +1,61 @@
+"""Micro-benchmark: per-request ORM overhead of the hot lookups.
+
+Compares the legacy ``Model.query`` calls the routes used to make with the
+cached statements in app/queries.py. It runs against in-memory SQLite so
+the numbers are dominated by Python-side statement building and
+compilation rather than the database round trip.
+
+    python benchmarks/orm_overhead.py --iterations 5000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.model import User  # noqa: E402
+from app import queries  # noqa: E402
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        User.__table__.create(db.engine)
+        db.session.add(User(uid=1, name="Bench", email="bench@example.com", phone="0700000000",
+                            password_hash="x", is_admin=False))
+        db.session.commit()
+
+        def per_request(lookup):
+            def run():
+                lookup()
+                # Each request starts with an empty session / identity map
+                db.session.remove()
+            return run
+
+        cases = {
+            "login (legacy Query.filter_by)": lambda: User.query.filter_by(email="bench@example.com").first(),
+            "login (cached lambda_stmt)": lambda: queries.user_by_email("bench@example.com"),
+            "get by id (legacy Query.get)": lambda: User.query.get(1),
+            "get by id (Session.get)": lambda: queries.get_or_none(User, 1),
+        }
+        for name, lookup in cases.items():
+            run = per_request(lookup)
+            run()  # warm the statement cache
+            seconds = timeit.timeit(run, number=args.iterations)
+            print(f"{name:<34} {seconds / args.iterations * 1e6:8.1f} us/call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark: pricing a 1,000-line cart.
+
+Times the pure ``compute_quote`` arithmetic on a synthetic catalog (no
+database needed). With ``--database-url`` pointing at a migrated Postgres
+database, it also times ``price_cart`` with an empty price memo. That
+covers the single ``WHERE id = ANY(:ids)`` price load a cart pays after
+a catalog change, and then the same call served from the memo. The
+synthetic products are inserted in a transaction that is rolled back.
+
+    python benchmarks/pricing.py --lines 1000 --iterations 200
+    python benchmarks/pricing.py --database-url postgresql://localhost/glam_bench
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pricing import compute_quote  # noqa: E402
+
+
+def time_compute_quote(args):
+    rng = random.Random(42)
+    prices = {pid: Decimal(rng.randint(100, 500000)) / 100 for pid in range(1, args.lines + 1)}
+    lines = [(pid, rng.randint(1, 5)) for pid in prices]
+    tiers = [('10000', '0.05'), ('50000', '0.10')]
+
+    quote = compute_quote(lines, prices, tiers, '0.16')
+    seconds = timeit.timeit(lambda: compute_quote(lines, prices, tiers, '0.16'), number=args.iterations)
+    print(f"compute_quote, {args.lines} lines: {seconds / args.iterations * 1000:.2f} ms/quote (total {quote['total']})")
+
+
+def time_price_cart(args):
+    from app import create_app, db
+    from app.config import Config
+    from app.model import Category, Product, Supplier
+    from app.pricing import price_cart, price_list
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        ADMISSION_ENABLED = False
+        CHANGE_NOTIFY_LISTEN = False
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        rng = random.Random(42)
+        category = Category(name="pricing-benchmark")
+        supplier = Supplier(name="pricing-benchmark")
+        products = [
+            Product(name=f"bench {i}", description="", price=Decimal(rng.randint(100, 500000)) / 100,
+                    purchase_price=0, stock_quantity=100, category=category, supplier=supplier)
+            for i in range(args.lines)
+        ]
+        db.session.add_all(products)
+        db.session.flush()
+        lines = [{"product_id": product.id, "quantity": rng.randint(1, 5)} for product in products]
+
+        try:
+            def cold():
+                price_list.invalidate()
+                price_cart(lines)
+
+            cold()
+            seconds = timeit.timeit(cold, number=args.iterations)
+            print(f"price_cart, {args.lines} lines, empty memo: {seconds / args.iterations * 1000:.2f} ms/quote")
+
+            price_cart(lines)
+            seconds = timeit.timeit(lambda: price_cart(lines), number=args.iterations)
+            print(f"price_cart, {args.lines} lines, memoized:   {seconds / args.iterations * 1000:.2f} ms/quote")
+        finally:
+            db.session.rollback()
+            price_list.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--database-url", help="Migrated Postgres database for the price_cart timings.")
+    args = parser.parse_args()
+
+    time_compute_quote(args)
+    if args.database_url:
+        time_price_cart(args)
+
+
+if __name__ == '__main__':
+    main()
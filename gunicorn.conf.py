@@ -0,0 +1,11 @@
+# Gunicorn settings: `gunicorn -c gunicorn.conf.py wsgi:app`
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the app is loaded; a no-op unless POOL_WARM_CONNECTIONS > 0
+    from app.startup import warm_up
+    warm_up(worker.wsgi)
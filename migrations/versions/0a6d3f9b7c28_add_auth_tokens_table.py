@@ -0,0 +1,35 @@
+"""Add auth_tokens table
+
+Revision ID: 0a6d3f9b7c28
+Revises: f25c7b8e3d61
+Create Date: 2026-10-19 17:02:13.318840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6d3f9b7c28'
+down_revision = 'f25c7b8e3d61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('auth_tokens',
+    sa.Column('jti', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index(op.f('ix_auth_tokens_user_id'), 'auth_tokens', ['user_id'], unique=False)
+    op.create_index(op.f('ix_auth_tokens_expires_at'), 'auth_tokens', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_auth_tokens_expires_at'), table_name='auth_tokens')
+    op.drop_index(op.f('ix_auth_tokens_user_id'), table_name='auth_tokens')
+    op.drop_table('auth_tokens')
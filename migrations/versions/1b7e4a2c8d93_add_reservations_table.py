@@ -0,0 +1,45 @@
+"""Add reservations table
+
+Revision ID: 1b7e4a2c8d93
+Revises: 0a6d3f9b7c28
+Create Date: 2026-10-19 17:46:55.902174
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b7e4a2c8d93'
+down_revision = '0a6d3f9b7c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservations',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_reservations_product_id_user_id_held', 'reservations', ['product_id', 'user_id'], unique=True,
+                    postgresql_where=sa.text("status = 'held'"))
+    op.create_index('ix_reservations_product_id_active', 'reservations', ['product_id'], unique=False,
+                    postgresql_where=sa.text("status IN ('held', 'converted')"))
+    op.create_index('ix_reservations_user_id_status', 'reservations', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_reservations_user_id_status', table_name='reservations')
+    op.drop_index('ix_reservations_product_id_active', table_name='reservations')
+    op.drop_index('uq_reservations_product_id_user_id_held', table_name='reservations')
+    op.drop_table('reservations')
@@ -0,0 +1,31 @@
+"""Add rate_limit_buckets table
+
+Revision ID: 2c9f5d3a1e47
+Revises: 1b7e4a2c8d93
+Create Date: 2026-10-19 18:20:37.455129
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c9f5d3a1e47'
+down_revision = '1b7e4a2c8d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('admitted', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    prefixes=['UNLOGGED']
+    )
+
+
+def downgrade():
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,33 @@
+"""Advance the id sequences of the partitioned tables past existing ids
+
+Orders, order items and transactions used to get random 6-digit ids from
+the API, so their sequences were never advanced. Now that the database
+assigns ids (the partitioned tables can't enforce a unique id), move each
+sequence past the largest existing id.
+
+Revision ID: 3d8a6e1f2b54
+Revises: 2c9f5d3a1e47
+Create Date: 2026-10-20 10:14:02.381946
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8a6e1f2b54'
+down_revision = '2c9f5d3a1e47'
+branch_labels = None
+depends_on = None
+
+TABLES = ('orders', 'order_items', 'transactions')
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(
+            f"SELECT setval('{table}_id_seq', GREATEST((SELECT max(id) FROM {table}), 1000000))"
+        )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,114 @@
+"""Partition orders, order_items and transactions by month
+
+Revision ID: 5e8d2b7c41a9
+Revises: a3c9e1f27b40
+Create Date: 2026-10-19 11:40:27.915304
+
+Each table is rebuilt as a declarative range-partitioned table on
+created_at, with one partition per month from the oldest row up to three
+months ahead plus a default partition. Further months are added by
+`flask partitions maintain`.
+
+Postgres requires the partition key in every unique constraint, so the
+primary keys become (id, created_at) and the foreign keys pointing at
+orders.id (from order_items and transactions) are dropped; plain indexes
+on order_id replace them.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8d2b7c41a9'
+down_revision = 'a3c9e1f27b40'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('orders', 'order_items', 'transactions')
+
+# Foreign keys recreated on the partitioned tables: (table, name, column, referent)
+FOREIGN_KEYS = (
+    ('orders', 'orders_user_id_fkey', 'user_id', 'users(uid)'),
+    ('order_items', 'fk_orderitem_user_id', 'user_id', 'users(uid)'),
+    ('order_items', 'order_items_product_id_fkey', 'product_id', 'products(id)'),
+    ('transactions', 'fk_transactions_user_id', 'user_id', 'users(uid)'),
+)
+
+INDEXES = (
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_user_id_created_at', 'order_items', ['user_id', 'created_at']),
+    ('ix_transactions_order_id', 'transactions', ['order_id']),
+    ('ix_transactions_user_id_created_at', 'transactions', ['user_id', 'created_at']),
+)
+
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month date;
+    last_month date := date_trunc('month', now()) + interval '3 months';
+BEGIN
+    SELECT coalesce(date_trunc('month', min(created_at)), date_trunc('month', now()))
+      INTO month FROM {table}_legacy;
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+            '{table}_p' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade():
+    op.drop_constraint('order_items_order_id_fkey', 'order_items', type_='foreignkey')
+    op.drop_constraint('fk_transactions_order_id', 'transactions', type_='foreignkey')
+
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        # Keep the id sequence alive when the legacy table is dropped
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL")
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        op.execute(
+            f"UPDATE {table}_legacy SET created_at = coalesce(updated_at, now()) WHERE created_at IS NULL"
+        )
+        op.execute(CREATE_MONTHLY_PARTITIONS.format(table=table))
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_legacy")
+        op.execute(f"DROP TABLE {table}_legacy CASCADE")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.create_primary_key(f"{table}_pkey", table, ['id', 'created_at'])
+
+    for table, name, column, referent in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referent}")
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned")
+        op.execute(f"DROP TABLE {table}_partitioned CASCADE")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at DROP NOT NULL")
+        op.create_primary_key(f"{table}_pkey", table, ['id'])
+
+    for table, name, column, referent in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referent}")
+
+    op.create_foreign_key('order_items_order_id_fkey', 'order_items', 'orders', ['order_id'], ['id'])
+    op.create_foreign_key('fk_transactions_order_id', 'transactions', 'orders', ['order_id'], ['id'])
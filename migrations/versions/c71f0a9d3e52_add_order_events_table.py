@@ -0,0 +1,35 @@
+"""Add order_events table
+
+Revision ID: c71f0a9d3e52
+Revises: 5e8d2b7c41a9
+Create Date: 2026-10-19 14:03:51.227410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71f0a9d3e52'
+down_revision = '5e8d2b7c41a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_events_user_id_id', 'order_events', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_order_events_user_id_id', table_name='order_events')
+    op.drop_table('order_events')
@@ -0,0 +1,39 @@
+"""Add reorder_recommendations table
+
+Revision ID: d4b92e6f1a07
+Revises: c71f0a9d3e52
+Create Date: 2026-10-19 15:12:08.551903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b92e6f1a07'
+down_revision = 'c71f0a9d3e52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reorder_recommendations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('supplier_id', sa.Integer(), nullable=False),
+    sa.Column('stock_quantity', sa.Integer(), nullable=False),
+    sa.Column('daily_velocity', sa.Numeric(precision=12, scale=3), nullable=False),
+    sa.Column('days_of_cover', sa.Numeric(precision=12, scale=1), nullable=False),
+    sa.Column('reorder_quantity', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['supplier_id'], ['suppliers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id')
+    )
+    op.create_index(op.f('ix_reorder_recommendations_supplier_id'), 'reorder_recommendations', ['supplier_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_reorder_recommendations_supplier_id'), table_name='reorder_recommendations')
+    op.drop_table('reorder_recommendations')
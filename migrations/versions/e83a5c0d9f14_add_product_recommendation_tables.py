@@ -0,0 +1,47 @@
+"""Add product_pairs, product_recommendations and job_watermarks tables
+
+Revision ID: e83a5c0d9f14
+Revises: d4b92e6f1a07
+Create Date: 2026-10-19 15:48:30.104627
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83a5c0d9f14'
+down_revision = 'd4b92e6f1a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_pairs',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'related_id')
+    )
+    op.create_table('product_recommendations',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.SmallInteger(), nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'rank')
+    )
+    op.create_table('job_watermarks',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('value', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('job_watermarks')
+    op.drop_table('product_recommendations')
+    op.drop_table('product_pairs')
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from app import create_app, db
+from app.cache import catalog_cache, role_cache
+from app.config import Config
+from app.pricing import price_list
+from flask_jwt_extended import create_access_token
+
+from app.model import User, Category, Supplier, Product, Order, OrderItem, Transaction, OrderEvent, AuthToken, Job, Reservation
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# Throwaway Postgres database for the tests that need Postgres (LISTEN/NOTIFY, partitions, ...).
+# Its public schema is dropped and migrated to head; without it those tests are skipped.
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: spawns interpreters or servers; deselect with -m 'not slow'")
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    CHANGE_NOTIFY_LISTEN = False
+    ADMISSION_ENABLED = False
+
+
+class PostgresTestConfig(TestConfig):
+    SQLALCHEMY_DATABASE_URI = TEST_DATABASE_URL
+
+
+# Only the tables the tests touch; the rest use Postgres-only DDL
+TABLES = [User.__table__, Category.__table__, Supplier.__table__, Product.__table__, Order.__table__,
+          OrderItem.__table__, Transaction.__table__, OrderEvent.__table__, AuthToken.__table__,
+          Job.__table__, Reservation.__table__]
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=TABLES)
+        yield app
+        db.session.remove()
+        db.metadata.drop_all(db.engine, tables=TABLES)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # In-process caches outlive the app; ids restart in every test database
+    yield
+    catalog_cache.clear()
+    role_cache.clear()
+    price_list.invalidate()
+
+
+@pytest.fixture(scope='session')
+def migrated_database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    app = create_app(PostgresTestConfig)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+        upgrade(directory=MIGRATIONS)
+        db.engine.dispose()
+
+
+@pytest.fixture
+def pg_app(migrated_database):
+    app = create_app(PostgresTestConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        tables = db.session.execute(text(
+            "SELECT string_agg(quote_ident(tablename), ', ') FROM pg_tables "
+            "WHERE schemaname = 'public' AND tablename <> 'alembic_version'"
+        )).scalar_one()
+        db.session.execute(text(f"TRUNCATE {tables} CASCADE"))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def user(app):
+    user = User(name="Test User", email="test@example.com", phone="0700000000", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(identity=user.uid)}"}
@@ -0,0 +1,19 @@
+from app.admission import Admission, MemoryBuckets
+
+
+def test_route_groups(app):
+    admission = Admission()
+    admission.configure(app.config)
+    assert admission.group_for('/product_categories', 'GET') == 'catalog'
+    assert admission.group_for('/product_categories/3', 'GET') == 'catalog'
+    assert admission.group_for('/users', 'POST') == 'auth'
+    assert admission.group_for('/users', 'GET') is None
+    assert admission.group_for('/users/reset_password', 'POST') == 'auth'
+    assert admission.group_for('/productsx', 'GET') is None
+
+
+def test_token_bucket():
+    buckets = MemoryBuckets()
+    assert [buckets.take('k', rate=1, burst=2) for _ in range(2)] == [0, 0]
+    assert buckets.take('k', rate=1, burst=2) > 0
+    assert buckets.take('other', rate=1, burst=2) == 0
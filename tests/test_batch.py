@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from app import db
+from app.events import hub
+from app.revocation import issue_token
+
+
+def test_missing_resources_keep_their_status(client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json=[
+        {"method": "GET", "path": "/products/999"},
+        {"method": "GET", "path": "/nope"},
+    ])
+    assert response.status_code == 200
+    assert [entry["status"] for entry in response.get_json()] == [404, 404]
+
+
+def test_streaming_endpoints_are_rejected_without_running(client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json=[
+        {"method": "GET", "path": "/events/orders"},
+    ])
+    assert response.status_code == 400
+    assert not hub._subscribers
+
+
+def test_nested_batches_are_rejected(client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json=[
+        {"method": "POST", "path": "/batch", "body": []},
+    ])
+    assert response.status_code == 400
+
+
+def test_logout_applies_to_the_rest_of_the_batch(client, user):
+    token = issue_token(user, expires_delta=timedelta(hours=1))
+    db.session.commit()
+    response = client.post('/batch', headers={"Authorization": f"Bearer {token}"}, json=[
+        {"method": "GET", "path": f"/users/{user.uid}"},
+        {"method": "POST", "path": "/logout"},
+        {"method": "GET", "path": f"/users/{user.uid}"},
+    ])
+    assert [entry["status"] for entry in response.get_json()] == [200, 200, 401]
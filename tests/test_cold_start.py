@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks.cold_start import BUDGETS, run_once
+
+
+@pytest.mark.slow
+def test_cold_start_within_budget():
+    # Fresh interpreters pointed at an unreachable database; start-up must not touch it
+    # Noise on a busy machine only adds time, so the best of the runs is checked
+    samples = [run_once() for _ in range(3)]
+    best = {metric: min(sample[metric] for sample in samples) for metric in BUDGETS}
+    over = {metric: round(ms) for metric, ms in best.items() if ms > BUDGETS[metric]}
+    assert not over, f"Cold start over budget (ms): {over}, budgets {BUDGETS}"
@@ -0,0 +1,86 @@
+import pytest
+
+from app import db
+from app.model import Order, OrderStatus, Transaction, User
+
+
+@pytest.fixture
+def admin_headers(client, user, auth_headers):
+    user.is_admin = True
+    db.session.commit()
+    return auth_headers
+
+
+@pytest.fixture
+def customers(app):
+    """Five customers; customer i has i orders, each paid 10 except one pending."""
+    customers = []
+    for i in range(5):
+        customer = User(name=f"Customer {i}", email=f"c{i}@example.com", phone=f"071{i:07d}", password_hash="x")
+        db.session.add(customer)
+        db.session.flush()
+        for n in range(i):
+            order = Order(user_id=customer.uid, total_amount=10, status=OrderStatus.DELIVERED)
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(Transaction(
+                order_id=order.id, user_id=customer.uid, amount=10, name=customer.name, email=customer.email,
+                phone=customer.phone, address="1 Road", city="Nairobi", zipCode="00100",
+                payment_status='Pending' if n == 0 else 'Paid'
+            ))
+        customers.append(customer)
+    db.session.commit()
+    return customers
+
+
+def all_pages(client, headers, query):
+    rows, cursor, pages = [], None, 0
+    while True:
+        url = f'/admin/customers?{query}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        rows.extend(body['data'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return rows, pages
+
+
+def test_pages_cover_every_customer_once(client, admin_headers, customers):
+    rows, pages = all_pages(client, admin_headers, 'limit=2&fields=uid')
+    assert [row['uid'] for row in rows] == sorted(row['uid'] for row in rows)
+    assert len(rows) == 6 and pages == 3
+
+
+def test_sorted_by_total_spent(client, admin_headers, customers):
+    rows, _ = all_pages(client, admin_headers, 'sort=total_spent&limit=2&fields=name')
+    assert [(row['name'], row['total_spent'], row['order_count']) for row in rows[:3]] == [
+        ("Customer 4", 30.0, 4), ("Customer 3", 20.0, 3), ("Customer 2", 10.0, 2)
+    ]
+    assert rows[0]['payment_status'] == {"Paid": 3, "Pending": 1}
+    # Ties (no spend) are broken by uid, descending with the sort
+    assert [row['total_spent'] for row in rows[3:]] == [0, 0, 0]
+
+
+def test_new_orders_dont_shift_later_pages(client, admin_headers, customers):
+    first = client.get('/admin/customers?sort=order_count&limit=3&fields=uid', headers=admin_headers).get_json()
+    # A customer already shown places more orders before the next page is read
+    for _ in range(5):
+        db.session.add(Order(user_id=customers[1].uid, total_amount=10, status=OrderStatus.PENDING))
+    db.session.commit()
+
+    second = client.get(f'/admin/customers?sort=order_count&limit=3&fields=uid&cursor={first["next_cursor"]}',
+                        headers=admin_headers).get_json()
+    seen = [row['uid'] for row in first['data'] + second['data']]
+    assert len(seen) == len(set(seen))
+
+
+def test_invalid_requests(client, auth_headers, admin_headers):
+    assert client.get('/admin/customers?sort=email', headers=admin_headers).status_code == 400
+    assert client.get('/admin/customers?cursor=nope', headers=admin_headers).status_code == 400
+    assert client.get('/admin/customers?limit=0', headers=admin_headers).status_code == 400
+
+
+def test_admins_only(client, auth_headers):
+    assert client.get('/admin/customers', headers=auth_headers).status_code == 403
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import event, select
+
+from app import db
+from app.model import Category, Product, Supplier
+
+
+@pytest.fixture
+def product(app):
+    product = Product(name="Serum", description="A long description", price=12.5, purchase_price=5,
+                      stock_quantity=10, category=Category(name="Skin care"), supplier=Supplier(name="Acme"))
+    db.session.add(product)
+    db.session.commit()
+    db.session.expunge_all()
+    return product
+
+
+@pytest.fixture
+def statements(app):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    yield captured
+    event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def test_only_requested_fields_are_returned(client, product):
+    response = client.get('/products?fields=name,price')
+    assert response.get_json() == [{"name": "Serum", "price": 12.5}]
+
+
+def test_only_requested_columns_are_selected(client, product, statements):
+    client.get('/products?fields=name,price')
+    [select] = [statement for statement in statements if statement.startswith('SELECT')]
+    assert 'products.name' in select and 'products.price' in select
+    assert 'products.description' not in select
+    assert 'JOIN' not in select
+
+
+def test_related_fields_join_only_what_they_need(client, product, statements):
+    response = client.get('/products?fields=name,category_name')
+    assert response.get_json() == [{"name": "Serum", "category_name": "Skin care"}]
+    [select] = [statement for statement in statements if statement.startswith('SELECT')]
+    assert 'JOIN categories' in select and 'suppliers' not in select
+
+
+def test_unknown_fields_are_rejected(client, product):
+    response = client.get('/products?fields=name,secret')
+    assert response.status_code == 400
+    assert "secret" in response.get_json()['error']
+    assert "name" in response.get_json()['allowed_fields']
+
+
+def test_single_supplier_with_fields(client, auth_headers, product):
+    supplier_id = db.session.execute(select(Supplier.id)).scalar_one()
+    response = client.get(f'/suppliers/{supplier_id}?fields=name', headers=auth_headers)
+    assert response.get_json() == {"name": "Acme"}
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.forecasting import compute_recommendations, run_replenishment
+from app.model import Category, Order, OrderItem, OrderStatus, Product, Supplier
+
+TODAY = date(2026, 10, 19)
+START = TODAY - timedelta(days=27)
+WINDOWS = dict(history_days=28, short_window=7, lead_time_days=7, target_cover_days=21)
+
+
+def sales(product_id, units_per_day, days):
+    """A row per day for the last ``days`` days of the window."""
+    return [(product_id, TODAY - timedelta(days=offset), units_per_day) for offset in range(days)]
+
+
+def test_steady_seller_below_cover_is_reordered():
+    [(index, velocity, cover, quantity)] = compute_recommendations([1], [10], sales(1, 2, 28), START, **WINDOWS)
+    assert (index, velocity, cover, quantity) == (0, 2.0, 5.0, 46)
+
+
+def test_recent_pick_up_in_sales_drives_velocity():
+    # 4 a day for the last week only: the long average is 1, the short one 4
+    [(_, velocity, _, quantity)] = compute_recommendations([1], [20], sales(1, 4, 7), START, **WINDOWS)
+    assert (velocity, quantity) == (4.0, 92)
+
+
+def test_products_with_enough_stock_or_no_sales_are_skipped():
+    rows = sales(1, 1, 28) + [(3, START - timedelta(days=1), 50)]  # product 3 only sold before the window
+    assert compute_recommendations([1, 2, 3], [100, 0, 0], rows, START, **WINDOWS) == []
+
+
+@pytest.fixture
+def app(pg_app):
+    # daily_sales groups with date_trunc, so the end-to-end tests run on Postgres
+    return pg_app
+
+
+def test_replenishment_report(app, client, user, auth_headers):
+    supplier = Supplier(name="Acme")
+    category = Category(name="Skin care")
+    fast = Product(name="Serum", description="", price=10, purchase_price=5, stock_quantity=5,
+                   category=category, supplier=supplier)
+    slow = Product(name="Toner", description="", price=10, purchase_price=5, stock_quantity=500,
+                   category=category, supplier=supplier)
+    db.session.add_all([fast, slow])
+    db.session.flush()
+    today = date.today()
+    for offset in range(28):
+        created_at = datetime.combine(today - timedelta(days=offset), datetime.min.time()) + timedelta(hours=12)
+        order = Order(user_id=user.uid, total_amount=30, status=OrderStatus.DELIVERED, created_at=created_at)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([
+            OrderItem(user_id=user.uid, order_id=order.id, product_id=fast.id, quantity=2, price=10,
+                      created_at=created_at),
+            OrderItem(user_id=user.uid, order_id=order.id, product_id=slow.id, quantity=1, price=10,
+                      created_at=created_at),
+        ])
+    db.session.commit()
+
+    assert run_replenishment(today=today) == 1
+    assert client.get('/admin/reorder_recommendations', headers=auth_headers).status_code == 403
+
+    user.is_admin = True
+    db.session.commit()
+    [group] = client.get('/admin/reorder_recommendations', headers=auth_headers).get_json()
+    assert group['supplier_name'] == "Acme"
+    assert [(item['product_name'], item['reorder_quantity']) for item in group['items']] == [("Serum", 51)]
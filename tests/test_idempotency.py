@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.idempotency import claim, fingerprint
+from app.model import Category, Order, Product, Supplier
+
+
+@pytest.fixture
+def app(pg_app):
+    # Keys are claimed with Postgres upserts, and orders are priced with = ANY(array)
+    return pg_app
+
+
+@pytest.fixture
+def order_body(app):
+    product = Product(name="Serum", description="", price=10, purchase_price=5, stock_quantity=10,
+                      category=Category(name="Skin care"), supplier=Supplier(name="Acme"))
+    db.session.add(product)
+    db.session.commit()
+    return {"items": [{"product_id": product.id, "quantity": 2}]}
+
+
+def post_order(client, headers, body, key):
+    return client.post('/orders', headers={**headers, "Idempotency-Key": key}, json=body)
+
+
+def order_count():
+    return db.session.execute(select(func.count(Order.id))).scalar_one()
+
+
+def test_retry_replays_the_first_response(client, auth_headers, order_body):
+    first = post_order(client, auth_headers, order_body, 'key-1')
+    retry = post_order(client, auth_headers, order_body, 'key-1')
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert order_count() == 1
+
+    assert post_order(client, auth_headers, order_body, 'key-2').status_code == 201
+    assert order_count() == 2
+
+
+def test_key_reused_for_a_different_request(client, auth_headers, order_body):
+    post_order(client, auth_headers, order_body, 'key-1')
+    response = post_order(client, auth_headers, {**order_body, "total": 20}, 'key-1')
+    assert response.status_code == 422
+    assert order_count() == 1
+
+
+def test_duplicate_of_a_request_still_running(app, client, auth_headers, user, order_body):
+    app.config['IDEMPOTENCY_WAIT_TIMEOUT'] = 0.2
+    # Claim the key as an in-flight first request would, with the retry's exact fingerprint
+    with app.test_request_context('/orders', method='POST', json=order_body):
+        assert claim(user.uid, 'key-1', fingerprint())
+
+    response = post_order(client, auth_headers, order_body, 'key-1')
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+    assert order_count() == 0
+
+
+def test_abandoned_claim_is_taken_over(app, client, auth_headers, user, order_body):
+    app.config['IDEMPOTENCY_LOCK_TIMEOUT'] = 0
+    with app.test_request_context('/orders', method='POST', json=order_body):
+        assert claim(user.uid, 'key-1', fingerprint())
+
+    assert post_order(client, auth_headers, order_body, 'key-1').status_code == 201
+    assert order_count() == 1
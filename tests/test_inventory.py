@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import select, update
+
+from app import db
+from app.inventory import available_stock, convert_holds, sweep
+from app.model import Category, Order, OrderItem, OrderStatus, Product, Reservation, Supplier, User
+
+
+@pytest.fixture
+def app(pg_app):
+    # Holds use advisory locks, unnest() and partial-index upserts
+    return pg_app
+
+
+@pytest.fixture
+def products(app):
+    category, supplier = Category(name="Skin care"), Supplier(name="Acme")
+    products = [
+        Product(name=name, description="", price=10, purchase_price=5, stock_quantity=5,
+                category=category, supplier=supplier)
+        for name in ("Serum", "Toner")
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+@pytest.fixture
+def other_headers(app):
+    other = User(name="Other", email="other@example.com", phone="0711111111", password_hash="x")
+    db.session.add(other)
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=other.uid)}"}
+
+
+def reserve(client, headers, *lines):
+    return client.post('/cart/reservations', headers=headers, json={
+        "items": [{"product_id": product.id, "quantity": quantity} for product, quantity in lines]
+    })
+
+
+def holds(status='held'):
+    return db.session.execute(
+        select(Reservation.user_id, Reservation.product_id, Reservation.quantity).where(Reservation.status == status)
+    ).all()
+
+
+def test_holds_count_against_other_carts(client, auth_headers, other_headers, products):
+    serum, _ = products
+    assert reserve(client, auth_headers, (serum, 3)).status_code == 201
+
+    response = reserve(client, other_headers, (serum, 3))
+    assert response.status_code == 409
+    assert response.get_json()['available'] == {str(serum.id): 2}
+    assert reserve(client, other_headers, (serum, 2)).status_code == 201
+    assert available_stock([serum.id]) == {serum.id: 0}
+
+
+def test_holds_are_all_or_nothing(client, auth_headers, products):
+    serum, toner = products
+    assert reserve(client, auth_headers, (serum, 1), (toner, 6)).status_code == 409
+    assert holds() == []
+
+
+def test_new_holds_replace_the_previous_ones(client, auth_headers, user, products):
+    serum, toner = products
+    reserve(client, auth_headers, (serum, 3), (toner, 1))
+    assert reserve(client, auth_headers, (serum, 5)).status_code == 201
+    assert holds() == [(user.uid, serum.id, 5)]
+
+
+def test_released_and_expired_holds_free_the_stock(client, auth_headers, other_headers, products):
+    serum, _ = products
+    reserve(client, auth_headers, (serum, 5))
+    assert client.delete('/cart/reservations', headers=auth_headers).status_code == 200
+    assert reserve(client, other_headers, (serum, 5)).status_code == 201
+
+    db.session.execute(update(Reservation).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    assert reserve(client, auth_headers, (serum, 5)).status_code == 201
+    sweep()
+    db.session.commit()
+    assert [quantity for _, _, quantity in holds()] == [5]
+    assert [quantity for _, _, quantity in holds('released')] == [5, 5]
+
+
+def test_paid_holds_are_settled_into_stock(client, auth_headers, user, products):
+    serum, toner = products
+    reserve(client, auth_headers, (serum, 2), (toner, 1))
+    order = Order(user_id=user.uid, total_amount=20, status=OrderStatus.PENDING)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(OrderItem(user_id=user.uid, order_id=order.id, product_id=serum.id, quantity=2, price=10))
+    db.session.commit()
+
+    # Only holds on the order's products become sales
+    assert convert_holds(user.uid, order.id) == 1
+    db.session.commit()
+    assert available_stock([serum.id, toner.id], user.uid) == {serum.id: 3, toner.id: 5}
+
+    sweep()
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Product, serum.id).stock_quantity == 3
+    assert holds('settled') == [(user.uid, serum.id, 2)]
+    assert available_stock([serum.id]) == {serum.id: 3}
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.jobs import claim_job, enqueue, job, run_job
+from app.model import Job
+
+
+@job('test_add')
+def add(a, b):
+    if a + b < 0:
+        raise ValueError("negative")
+
+
+def test_claim_and_run(app):
+    enqueue('test_add', a=1, b=2)
+    db.session.commit()
+
+    claimed = claim_job()
+    assert (claimed.status, claimed.attempts) == ('running', 1)
+    assert claim_job() is None
+    assert run_job(claimed)
+    assert db.session.get(Job, claimed.id).status == 'done'
+
+
+def test_delayed_job_waits(app):
+    enqueue('test_add', delay=timedelta(minutes=5), a=1, b=2)
+    db.session.commit()
+    assert claim_job() is None
+
+
+def test_failures_retry_then_fail(app):
+    enqueue('test_add', max_attempts=2, a=-5, b=1)
+    db.session.commit()
+
+    first = claim_job()
+    assert not run_job(first)
+    retried = db.session.get(Job, first.id)
+    assert retried.status == 'queued' and retried.run_at > datetime.utcnow()
+    assert 'negative' in retried.last_error
+
+    retried.run_at = datetime.utcnow()
+    db.session.commit()
+    assert not run_job(claim_job())
+    assert db.session.get(Job, first.id).status == 'failed'
+
+
+def abandon(attempts, max_attempts):
+    """A job whose worker died mid-run long ago."""
+    abandoned = Job(name='test_add', payload={"a": 1, "b": 2}, status='running', attempts=attempts,
+                    max_attempts=max_attempts, run_at=datetime.utcnow() - timedelta(hours=2),
+                    locked_at=datetime.utcnow() - timedelta(hours=1))
+    db.session.add(abandoned)
+    db.session.commit()
+    return abandoned.id
+
+
+def test_abandoned_job_is_reclaimed(app):
+    job_id = abandon(attempts=1, max_attempts=3)
+    claimed = claim_job()
+    assert (claimed.id, claimed.attempts) == (job_id, 2)
+
+
+def test_abandoned_job_out_of_attempts_fails(app):
+    job_id = abandon(attempts=3, max_attempts=3)
+    assert claim_job() is None
+    failed = db.session.get(Job, job_id)
+    assert (failed.status, failed.attempts, failed.locked_at) == ('failed', 3, None)
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.model import Category, Product, Supplier
+
+
+@pytest.fixture
+def app(pg_app):
+    # Multi-get loads rows with = ANY(array), so these tests run on Postgres
+    return pg_app
+
+
+@pytest.fixture
+def products(app):
+    category = Category(name="Skin care")
+    supplier = Supplier(name="Acme")
+    products = [
+        Product(name=name, description="", price=10, purchase_price=5, stock_quantity=10,
+                category=category, supplier=supplier)
+        for name in ("Serum", "Toner", "Mask")
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def test_products_by_ids_keep_the_requested_order(client, products):
+    serum, toner, mask = products
+    response = client.get(f'/products?ids={mask.id},{serum.id},999999,{mask.id}')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [product['name'] for product in body['data']] == ["Mask", "Serum"]
+    assert body['missing'] == [999999]
+
+
+def test_products_by_ids_are_served_from_the_catalog_cache(client, products):
+    serum = products[0]
+    assert client.get(f'/products?ids={serum.id}').get_json()['data'][0]['name'] == "Serum"
+    # Changed behind the ORM's back, so nothing evicts the cached entry
+    db.session.execute(text("UPDATE products SET name = 'Renamed' WHERE id = :id"), {"id": serum.id})
+    db.session.commit()
+    assert client.get(f'/products?ids={serum.id}').get_json()['data'][0]['name'] == "Serum"
+
+
+def test_suppliers_by_ids_with_fields(client, auth_headers, products):
+    supplier = products[0].supplier
+    response = client.get(f'/suppliers?ids={supplier.id}&fields=name', headers=auth_headers)
+    assert response.get_json() == {"data": [{"name": "Acme"}], "missing": []}
+
+
+def test_users_by_ids(client, auth_headers, user):
+    response = client.get(f'/users?ids={user.uid}&fields=uid,email', headers=auth_headers)
+    assert response.get_json()['data'] == [{"uid": user.uid, "email": user.email}]
+
+
+def test_invalid_id_lists(client, app):
+    assert client.get('/products?ids=1,x').status_code == 400
+    app.config['MULTI_GET_MAX_IDS'] = 2
+    assert client.get('/products?ids=1,2,3').status_code == 400
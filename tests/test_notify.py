@@ -0,0 +1,82 @@
+import queue
+import threading
+
+from sqlalchemy import text
+
+from app import db
+from app import notify
+from app.cache import catalog_cache
+from app.model import Supplier
+
+
+def start_listener(app, monkeypatch):
+    """Run the listener in a thread; returns ``(received messages, stop)`` once it is listening."""
+    received = queue.Queue()
+    monkeypatch.setitem(notify._handlers, 'probe', [received.put])
+    stop = threading.Event()
+    listener = threading.Thread(target=notify.listen, args=(app, stop), daemon=True)
+    listener.start()
+    # The listener runs every handler with id None once it is listening
+    assert received.get(timeout=10) == {"entity": 'probe', "id": None}
+
+    def stop_listener():
+        stop.set()
+        listener.join(timeout=10)
+    return received, stop_listener
+
+
+def test_commit_evicts_cached_entries_locally(app):
+    supplier = Supplier(name="Acme")
+    db.session.add(supplier)
+    db.session.commit()
+    catalog_cache.set(('supplier', supplier.id), {"name": "Acme"})
+    catalog_cache.set(('product', 1), {"supplier_name": "Acme"})
+
+    supplier.name = "Acme Ltd"
+    db.session.commit()
+    assert catalog_cache.get(('supplier', supplier.id)) is None
+    assert catalog_cache.get(('product', 1)) is None
+
+
+def test_rollback_evicts_nothing(app):
+    supplier = Supplier(name="Acme")
+    db.session.add(supplier)
+    db.session.commit()
+    catalog_cache.set(('supplier', supplier.id), {"name": "Acme"})
+
+    supplier.name = "Acme Ltd"
+    db.session.flush()
+    db.session.rollback()
+    assert catalog_cache.get(('supplier', supplier.id)) == {"name": "Acme"}
+
+
+def test_listener_dispatches_notifications(pg_app, monkeypatch):
+    received, stop_listener = start_listener(pg_app, monkeypatch)
+    try:
+        db.session.execute(text("SELECT pg_notify(:channel, :payload)"), {
+            "channel": pg_app.config['CHANGE_NOTIFY_CHANNEL'], "payload": '{"entity": "probe", "id": 7}'
+        })
+        db.session.commit()
+        assert received.get(timeout=10) == {"entity": 'probe', "id": 7}
+    finally:
+        stop_listener()
+
+
+def test_commits_reach_other_workers(pg_app, monkeypatch):
+    received, stop_listener = start_listener(pg_app, monkeypatch)
+    monkeypatch.setitem(notify._handlers, 'supplier', [received.put])
+    try:
+        supplier = Supplier(name="Acme")
+        db.session.add(supplier)
+        db.session.flush()
+        db.session.rollback()
+
+        supplier = Supplier(name="Acme")
+        db.session.add(supplier)
+        db.session.commit()
+        # The rolled back insert was never announced; the commit is, locally and then by the listener
+        assert received.get(timeout=10) == {"entity": 'supplier', "id": supplier.id}
+        assert received.get(timeout=10) == {"entity": 'supplier', "id": supplier.id}
+        assert received.empty()
+    finally:
+        stop_listener()
@@ -0,0 +1,56 @@
+from sqlalchemy import select
+
+from app import db
+from app.events import deliver_order_event, hub
+from app.model import Order, OrderEvent, OrderStatus
+
+
+def test_committing_an_order_records_an_event(user):
+    order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.PENDING)
+    db.session.add(order)
+    db.session.commit()
+
+    events = db.session.execute(select(OrderEvent)).scalars().all()
+    assert [(e.entity, e.entity_id, e.order_id, e.status) for e in events] == [
+        ('order', order.id, order.id, 'Pending')
+    ]
+
+
+def test_status_change_records_another_event(user):
+    order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.PENDING)
+    db.session.add(order)
+    db.session.commit()
+
+    order.status = OrderStatus.SHIPPED
+    db.session.commit()
+
+    statuses = db.session.execute(select(OrderEvent.status).order_by(OrderEvent.id)).scalars().all()
+    assert statuses == ['Pending', 'Shipped']
+
+
+def test_delivered_event_payload(app):
+    subscriber = hub.subscribe(42)
+    try:
+        deliver_order_event({
+            "entity": 'order_event', "id": 7, "user_id": 42, "type": 'order',
+            "event_entity_id": 3, "order_id": 3, "status": 'Shipped', "created_at": '2026-01-01T00:00:00'
+        })
+        assert subscriber.get_nowait() == {
+            "id": 7, "type": 'order', "entity_id": 3, "order_id": 3,
+            "status": 'Shipped', "created_at": '2026-01-01T00:00:00'
+        }
+    finally:
+        hub.unsubscribe(42, subscriber)
+
+
+def test_subscriber_gets_committed_events_live(user):
+    subscriber = hub.subscribe(user.uid)
+    try:
+        order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.PENDING)
+        db.session.add(order)
+        db.session.commit()
+
+        payload = subscriber.get_nowait()
+        assert (payload['type'], payload['entity_id'], payload['status']) == ('order', order.id, 'Pending')
+    finally:
+        hub.unsubscribe(user.uid, subscriber)
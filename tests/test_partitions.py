@@ -0,0 +1,52 @@
+from flask_migrate import check
+
+from app import db
+from app.model import Order, OrderItem, OrderStatus, Transaction
+from app.partitions import is_partition
+
+from .conftest import MIGRATIONS
+
+
+def test_partition_names():
+    assert is_partition('orders_p2026_10')
+    assert is_partition('transactions_default')
+    assert not is_partition('orders')
+    assert not is_partition('order_events')
+
+
+def test_order_relationships_without_foreign_keys(user):
+    order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.PENDING)
+    db.session.add(order)
+    db.session.flush()
+    item = OrderItem(user_id=user.uid, order_id=order.id, product_id=1, quantity=1, price=10)
+    transaction = Transaction(
+        order_id=order.id, user_id=user.uid, amount=10, name="Test", email="test@example.com",
+        phone="0700000000", address="1 Road", city="Nairobi", zipCode="00100", payment_status='Pending'
+    )
+    db.session.add_all([item, transaction])
+    db.session.commit()
+    db.session.expire_all()
+
+    order = db.session.get(Order, order.id)
+    assert [i.id for i in order.items] == [item.id]
+    assert [t.id for t in order.transaction] == [transaction.id]
+    assert db.session.get(OrderItem, item.id).order.id == order.id
+
+
+def test_user_transactions_join_orders(client, auth_headers, user):
+    order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.PENDING)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(Transaction(
+        order_id=order.id, user_id=user.uid, amount=10, name="Test", email="test@example.com",
+        phone="0700000000", address="1 Road", city="Nairobi", zipCode="00100", payment_status='Paid'
+    ))
+    db.session.commit()
+
+    response = client.get(f'/users/{user.uid}/transactions?since=2000-01-01', headers=auth_headers)
+    assert [transaction['order_id'] for transaction in response.get_json()] == [order.id]
+
+
+def test_models_match_the_migrated_schema(pg_app):
+    # Exits non-zero (SystemExit) when autogenerate would emit operations, e.g. dropping partitions
+    check(directory=MIGRATIONS)
@@ -0,0 +1,19 @@
+from app import db
+from app.model import User
+from app.password_reset import make_token
+
+
+def test_reset_token_is_not_a_session(client, user):
+    token = make_token(user)
+    response = client.get(f'/users/{user.uid}', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code in (401, 422)
+
+
+def test_reset_token_works_once(client, user):
+    token = make_token(user)
+    response = client.post('/users/reset_password/confirm', json={"token": token, "password": "new-secret"})
+    assert response.status_code == 200
+
+    response = client.post('/users/reset_password/confirm', json={"token": token, "password": "again"})
+    assert response.status_code == 400
+    assert db.session.get(User, user.uid).password_hash != "x"
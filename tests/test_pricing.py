@@ -0,0 +1,99 @@
+import time
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.model import Category, Order, OrderStatus, Product, Supplier
+from app.pricing import PricingError, compute_quote, price_cart, price_list
+
+
+@pytest.fixture
+def app(pg_app):
+    # Prices are loaded with = ANY(array), so these tests run on Postgres
+    return pg_app
+
+
+@pytest.fixture
+def products(app):
+    category = Category(name="Skin care")
+    supplier = Supplier(name="Acme")
+    products = [
+        Product(name="Serum", description="", price=Decimal('12.50'), purchase_price=5, stock_quantity=10,
+                category=category, supplier=supplier),
+        Product(name="Toner", description="", price=Decimal('7.25'), purchase_price=3, stock_quantity=10,
+                category=category, supplier=supplier),
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def test_compute_quote():
+    quote = compute_quote([(1, 2), (2, 1)], {1: Decimal('100'), 2: Decimal('50')},
+                          tiers=[('200', '0.10')], tax_rate='0.16')
+    assert quote['subtotal'] == Decimal('250')
+    assert quote['discount'] == Decimal('25.00')
+    assert quote['tax'] == Decimal('36.00')
+    assert quote['total'] == Decimal('261.00')
+
+
+def test_create_order_computes_the_total(client, auth_headers, products):
+    serum, toner = products
+    response = client.post('/orders', headers=auth_headers, json={
+        "items": [{"product_id": serum.id, "quantity": 2}, {"product_id": toner.id, "quantity": 1}]
+    })
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['total_amount'], body['status']) == (32.25, 'Pending')
+    assert db.session.get(Order, body['id']).status == OrderStatus.PENDING
+
+
+def test_create_order_rejects_a_stale_client_total(client, auth_headers, products):
+    response = client.post('/orders', headers=auth_headers, json={
+        "items": [{"product_id": products[0].id, "quantity": 1}], "total": 10
+    })
+    assert response.status_code == 409
+    assert response.get_json()['quote']['total'] == 12.5
+
+
+def test_create_order_without_a_body(client, auth_headers):
+    response = client.post('/orders', headers=auth_headers, data='null', content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Cart is empty"
+
+
+def test_prices_are_memoized(app, products):
+    serum = products[0]
+    assert price_cart([{"product_id": serum.id, "quantity": 1}])['total'] == Decimal('12.50')
+    # Changed behind the ORM's back, so nothing invalidates the memo
+    db.session.execute(text("UPDATE products SET price = 99 WHERE id = :id"), {"id": serum.id})
+    db.session.commit()
+    assert price_cart([{"product_id": serum.id, "quantity": 1}])['total'] == Decimal('12.50')
+
+
+def test_product_changes_invalidate_the_memo(app, products):
+    serum = products[0]
+    price_cart([{"product_id": serum.id, "quantity": 1}])
+    serum.price = Decimal('15.00')
+    db.session.commit()
+    assert price_cart([{"product_id": serum.id, "quantity": 1}])['total'] == Decimal('15.00')
+
+
+def test_memo_expires_after_the_cache_ttl(app, products, monkeypatch):
+    serum = products[0]
+    price_cart([{"product_id": serum.id, "quantity": 1}])
+    db.session.execute(text("UPDATE products SET price = 99 WHERE id = :id"), {"id": serum.id})
+    db.session.commit()
+
+    monkeypatch.setattr(price_list, '_started_at', time.monotonic() - app.config['CATALOG_CACHE_TTL'] - 1)
+    assert price_cart([{"product_id": serum.id, "quantity": 1}])['total'] == Decimal('99.00')
+
+
+def test_unavailable_products_are_reported(app, products):
+    products[1].status = 'inactive'
+    db.session.commit()
+    with pytest.raises(PricingError) as error:
+        price_cart([{"product_id": products[0].id, "quantity": 1}, {"product_id": products[1].id, "quantity": 1}])
+    assert error.value.details == {"unavailable": [products[1].id]}
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import db
+from app.model import Category, Order, OrderItem, OrderStatus, Product, ProductPair, Supplier
+from app.recommendations import build
+
+
+@pytest.fixture
+def app(pg_app):
+    # Pairs are counted with Postgres upserts and = ANY(array)
+    return pg_app
+
+
+@pytest.fixture
+def catalog(app):
+    category, supplier = Category(name="Skin care"), Supplier(name="Acme")
+    products = {
+        name: Product(name=name, description="", price=10, purchase_price=5, stock_quantity=10,
+                      category=category, supplier=supplier)
+        for name in ("Serum", "Toner", "Mask", "Balm")
+    }
+    db.session.add_all(products.values())
+    db.session.commit()
+    return products
+
+
+def place_order(user, products, created_at):
+    order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.DELIVERED, created_at=created_at)
+    db.session.add(order)
+    db.session.flush()
+    add_items(user, order, products, created_at)
+    return order
+
+
+def add_items(user, order, products, created_at):
+    db.session.add_all(
+        OrderItem(user_id=user.uid, order_id=order.id, product_id=product.id, quantity=1, price=10,
+                  created_at=created_at)
+        for product in products
+    )
+    db.session.commit()
+
+
+def pair_counts():
+    return {(pair.product_id, pair.related_id): pair.orders
+            for pair in db.session.execute(select(ProductPair)).scalars()}
+
+
+def test_frequently_bought_together(client, user, catalog):
+    serum, toner, mask, balm = catalog.values()
+    start = datetime.utcnow() - timedelta(hours=2)
+    first = place_order(user, [serum, toner, mask], start)
+    place_order(user, [serum, toner], start)
+    place_order(user, [serum, mask], start)
+    assert build(now=start + timedelta(hours=1)) == 3
+
+    response = client.get(f'/products/{serum.id}/recommendations?fields=name')
+    assert response.get_json() == [
+        {"name": "Toner", "orders_together": 2},
+        {"name": "Mask", "orders_together": 2},
+    ]
+    # Toner and mask share a single order, under RECOMMENDATIONS_MIN_ORDERS
+    assert [item['name'] for item in client.get(f'/products/{toner.id}/recommendations').get_json()] == ["Serum"]
+
+    # An order that gains an item later only adds the pairs with the new product
+    add_items(user, first, [balm], start + timedelta(minutes=90))
+    before = pair_counts()
+    assert build(now=start + timedelta(hours=2)) == 4
+    after = pair_counts()
+    assert after[(serum.id, toner.id)] == before[(serum.id, toner.id)] == 2
+    assert after[(balm.id, serum.id)] == after[(serum.id, balm.id)] == 1
+
+    # A full recount agrees with the incremental one
+    assert build(full=True, now=start + timedelta(hours=2)) == 4
+    assert pair_counts() == after
+
+
+def test_nothing_new_to_count(app, catalog):
+    assert build() == 0
+    assert build() == 0
@@ -0,0 +1,84 @@
+import queue
+import threading
+import time
+
+from sqlalchemy import text
+
+from app import db
+from app import notify
+from app.model import User
+from app.revocation import issue_token, revocations
+from datetime import timedelta
+
+
+def login_headers(user):
+    token = issue_token(user, expires_delta=timedelta(hours=1))
+    db.session.commit()
+    return {"Authorization": f"Bearer {token}"}
+
+
+def revoke_elsewhere(uid, notify_channel=None):
+    """Revoke ``uid``'s tokens the way another worker would: in its own transaction, not this process's session."""
+    with db.engine.begin() as connection:
+        jtis = connection.execute(
+            text("UPDATE auth_tokens SET revoked_at = CURRENT_TIMESTAMP WHERE user_id = :uid RETURNING jti"),
+            {"uid": uid}
+        ).scalars().all()
+        if notify_channel:
+            for jti in jtis:
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {
+                    "channel": notify_channel, "payload": f'{{"entity": "token", "id": "{jti}"}}'
+                })
+    return jtis
+
+
+def test_role_change_through_update_user_revokes_tokens(client, user):
+    headers = login_headers(user)
+    assert client.get(f'/users/{user.uid}', headers=headers).status_code == 200
+
+    response = client.put(f'/users/{user.uid}', headers=headers, json={"is_admin": True})
+    assert response.status_code == 200
+    assert client.get(f'/users/{user.uid}', headers=headers).status_code == 401
+
+
+def test_profile_edit_keeps_tokens(client, user):
+    headers = login_headers(user)
+    client.put(f'/users/{user.uid}', headers=headers, json={"name": "Renamed"})
+    assert client.get(f'/users/{user.uid}', headers=headers).status_code == 200
+    assert db.session.get(User, user.uid).name == "Renamed"
+
+
+def test_revocation_on_another_worker_applies_without_a_listener(client, user):
+    headers = login_headers(user)
+    assert client.get(f'/users/{user.uid}', headers=headers).status_code == 200
+
+    revoke_elsewhere(user.uid)
+    assert client.get(f'/users/{user.uid}', headers=headers).status_code == 401
+
+
+def test_revocation_on_another_worker_arrives_through_the_listener(pg_app, monkeypatch):
+    ready = queue.Queue()
+    monkeypatch.setitem(notify._handlers, 'probe', [ready.put])
+    user = User(name="Test User", email="test@example.com", phone="0700000000", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    headers = login_headers(user)
+    client = pg_app.test_client()
+
+    stop = threading.Event()
+    listener = threading.Thread(target=notify.listen, args=(pg_app, stop), daemon=True)
+    listener.start()
+    try:
+        ready.get(timeout=10)
+        assert notify.listening()
+        assert client.get(f'/users/{user.uid}', headers=headers).status_code == 200
+
+        [jti] = revoke_elsewhere(user.uid, notify_channel=pg_app.config['CHANGE_NOTIFY_CHANNEL'])
+        deadline = time.monotonic() + 10
+        while jti not in revocations._revoked and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert client.get(f'/users/{user.uid}', headers=headers).status_code == 401
+    finally:
+        stop.set()
+        listener.join(timeout=10)
+    assert not notify.listening()
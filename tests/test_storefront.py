@@ -0,0 +1,47 @@
+import pytest
+
+from app import db
+from app.model import Category, Order, OrderStatus, Product, Supplier
+
+
+@pytest.fixture
+def catalog(app):
+    supplier = Supplier(name="Acme")
+    skin, hair = Category(name="Skin care"), Category(name="Hair")
+    products = [
+        Product(name=f"Serum {i}", description="", price=10, purchase_price=5, stock_quantity=10,
+                category=skin, supplier=supplier)
+        for i in range(3)
+    ]
+    products.append(Product(name="Old shampoo", description="", price=10, purchase_price=5, stock_quantity=0,
+                            category=hair, supplier=supplier, status='inactive'))
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def test_bootstrap_for_anonymous_visitors(client, catalog):
+    body = client.get('/storefront/bootstrap?page_size=2&fields=name').get_json()
+    assert body['categories'] == [
+        {"id": catalog[3].category_id, "name": "Hair", "product_count": 0},
+        {"id": catalog[0].category_id, "name": "Skin care", "product_count": 3},
+    ]
+    assert len(body['products']) == 2 and set(body['products'][0]) == {"name"}
+    assert body['has_more_products'] is True
+    assert body['recent_orders'] == []
+
+
+def test_bootstrap_includes_recent_orders_with_a_token(client, auth_headers, user, catalog):
+    db.session.add(Order(user_id=user.uid, total_amount=20, status=OrderStatus.PENDING))
+    db.session.commit()
+    body = client.get('/storefront/bootstrap', headers=auth_headers).get_json()
+    assert [(order['user_id'], order['status']) for order in body['recent_orders']] == [(user.uid, 'Pending')]
+    assert body['has_more_products'] is False
+
+
+def test_product_changes_refresh_the_cached_bootstrap(client, catalog):
+    assert client.get('/storefront/bootstrap?fields=name').get_json()['products'][0]['name'].startswith("Serum")
+    for product in catalog[:3]:
+        product.status = 'inactive'
+    db.session.commit()
+    assert client.get('/storefront/bootstrap?fields=name').get_json()['products'] == []
@@ -0,0 +1,23 @@
+from sqlalchemy import select
+
+from app import db
+from app.model import Job, Order, OrderStatus, Transaction
+
+
+def test_repeated_paid_updates_enqueue_one_shipment(client, user, auth_headers):
+    order = Order(user_id=user.uid, total_amount=10, status=OrderStatus.PENDING)
+    db.session.add(order)
+    db.session.flush()
+    transaction = Transaction(
+        order_id=order.id, user_id=user.uid, amount=10, name="Test", email="test@example.com",
+        phone="0700000000", address="1 Road", city="Nairobi", zipCode="00100", payment_status='Pending'
+    )
+    db.session.add(transaction)
+    db.session.commit()
+
+    for _ in range(2):
+        response = client.put(f'/transactions/{transaction.id}', headers=auth_headers, json={"payment_status": "Paid"})
+        assert response.status_code == 200
+
+    names = db.session.execute(select(Job.name)).scalars().all()
+    assert names == ['mark_order_shipped']